@@ -3,6 +3,7 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+from intermediate_store import load_stage
 
 # === Setup ===
 file_path = "INPUT YOUR FILE PATH HERE"
@@ -10,7 +11,7 @@ output_folder = "INPUT YOUR FILE PATH HERE"
 os.makedirs(output_folder, exist_ok=True)
 
 # === Load data ===
-df = pd.read_csv(file_path, low_memory=False)
+df = load_stage(file_path, columns=['real_price', 'distance_to_station', 'railway_period'])
 df = df[df['real_price'] < 2_000_000]
 df = df[df['distance_to_station'] >= 0]
 
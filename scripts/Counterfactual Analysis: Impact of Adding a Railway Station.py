@@ -3,9 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from lightgbm import LGBMRegressor
 import os
-
-# === Load Dataset ===
-df = pd.read_csv("INPUT YOUR FILE PATH HERE")
+from intermediate_store import load_stage
 
 # === Features and Target ===
 feature_cols = [
@@ -15,6 +13,9 @@ feature_cols = [
 ]
 target_col = 'log_real_price'
 
+# === Load Dataset ===
+df = load_stage("INPUT YOUR FILE PATH HERE", columns=feature_cols + [target_col, 'town/city', 'date_of_transfer'])
+
 # === Train LightGBM model ===
 X = df[feature_cols]
 y = df[target_col]
@@ -1,27 +1,44 @@
 import pandas as pd
 import numpy as np
 import os
+import time
+from joblib import Parallel, delayed
+from sklearn.base import clone
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 from xgboost import XGBRegressor
 from lightgbm import LGBMRegressor
-from sklearn.model_selection import cross_val_score, KFold
-from sklearn.metrics import make_scorer, mean_squared_error, mean_absolute_error, r2_score
+from sklearn.model_selection import KFold
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from intermediate_store import load_stage, save_stage, stage_columns
+from instrumentation import measure
 
-# === Load Dataset ===
-df = pd.read_csv("INPUT YOUR FILE PATH HERE")
+# === Paths ===
+input_path = "INPUT YOUR FILE PATH HERE"
+output_path = "INPUT YOUR FILE PATH HERE"
+oof_output_path = None  # out-of-fold predictions (path), None to skip
 
-# === Drop non-numeric or irrelevant columns ===
-df = df.drop(columns=["town/city", "railway_period", "real_price"], errors="ignore")
+# === Parallel settings ===
+# Folds of every model run as separate tasks; the CPU budget is split between
+# concurrent tasks and each model's own threads.
+cpu_budget = os.cpu_count() or 1
+
+# === Load Dataset ===
+base_feature_cols = ['log_distance_to_station', 'business_count', 'log_interaction', 'year_of_transaction']
+df = load_stage(input_path, columns=[
+    col for col in stage_columns(input_path)
+    if col in base_feature_cols or col == 'log_real_price'
+    or (col.startswith("railway_") and col != "railway_period")
+    or col.startswith('log_distance_to_station_') or '_within_' in col
+])
 
 # === Define Features and Target ===
 one_hot_cols = [col for col in df.columns if col.startswith("railway_")]
+spatial_cols = [col for col in df.columns if col.startswith('log_distance_to_station_') or '_within_' in col]
 feature_cols = [
-    'log_distance_to_station',
-    'business_count',
-    'log_interaction',
-    'year_of_transaction',
-    *one_hot_cols
+    *base_feature_cols,
+    *one_hot_cols,
+    *spatial_cols
 ]
 target_col = 'log_real_price'
 X = df[feature_cols]
@@ -35,27 +52,67 @@ models = {
     "LightGBM": LGBMRegressor(n_estimators=100, learning_rate=0.1, max_depth=3, random_state=42)
 }
 
-# === Cross-Validation ===
+# === Cross-Validation: each fold fitted once, all metrics from its predictions ===
 cv = KFold(n_splits=5, shuffle=True, random_state=42)
-results = []
+folds = list(cv.split(X))
+X_values = X.to_numpy(dtype=np.float64)
+y_values = y.to_numpy(dtype=np.float64)
+
+
+def fit_fold(model, n_threads, X_all, y_all, train_idx, test_idx):
+    model = clone(model)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=n_threads)
+    start = time.perf_counter()
+    model.fit(X_all[train_idx], y_all[train_idx])
+    fit_seconds = time.perf_counter() - start
+    return model.predict(X_all[test_idx]), fit_seconds
 
-for name, model in models.items():
-    rmse_scores = -cross_val_score(model, X, y, cv=cv, scoring="neg_root_mean_squared_error")
-    mae_scores = -cross_val_score(model, X, y, cv=cv, scoring="neg_mean_absolute_error")
-    r2_scores = cross_val_score(model, X, y, cv=cv, scoring="r2")
 
+tasks = [(name, fold) for name in models for fold in range(len(folds))]
+n_parallel = max(1, min(len(tasks), cpu_budget))
+n_threads = max(1, cpu_budget // n_parallel)
+
+with measure(f"cross-validation ({len(tasks)} fits, {n_parallel} parallel x {n_threads} threads)"):
+    fitted = Parallel(n_jobs=n_parallel, backend='loky')(
+        delayed(fit_fold)(models[name], n_threads, X_values, y_values, *folds[fold])
+        for name, fold in tasks
+    )
+
+# === Scores per fold and out-of-fold predictions ===
+oof = pd.DataFrame({'row': np.arange(len(y_values)), 'fold': -1, target_col: y_values})
+for fold, (_, test_idx) in enumerate(folds):
+    oof.loc[test_idx, 'fold'] = fold
+
+fold_scores = {name: [] for name in models}
+fit_seconds = {name: 0.0 for name in models}
+for (name, fold), (y_pred, seconds) in zip(tasks, fitted):
+    test_idx = folds[fold][1]
+    y_true = y_values[test_idx]
+    oof.loc[test_idx, f'pred_{name}'] = y_pred
+    fold_scores[name].append((np.sqrt(mean_squared_error(y_true, y_pred)),
+                              mean_absolute_error(y_true, y_pred),
+                              r2_score(y_true, y_pred)))
+    fit_seconds[name] += seconds
+
+results = []
+for name in models:
+    rmse_scores, mae_scores, r2_scores = np.array(fold_scores[name]).T
     results.append({
         "Model": name,
         "RMSE Mean": round(rmse_scores.mean(), 4),
         "RMSE Std": round(rmse_scores.std(), 4),
         "MAE Mean": round(mae_scores.mean(), 4),
-        "R² Mean": round(r2_scores.mean(), 4)
+        "R² Mean": round(r2_scores.mean(), 4),
+        "Fit Seconds": round(fit_seconds[name], 2)
     })
 
 # === Save Results ===
-output_path = "INPUT YOUR FILE PATH HERE"
 os.makedirs(os.path.dirname(output_path), exist_ok=True)
 pd.DataFrame(results).to_csv(output_path, index=False)
+if oof_output_path:
+    save_stage(oof, oof_output_path)
+    print(f"Out-of-fold predictions saved to: {oof_output_path}")
 
 # === Display Results ===
 print("Cross-validation completed and saved to:")
@@ -8,19 +8,21 @@ from sklearn.model_selection import train_test_split
 from xgboost import XGBRegressor
 from lightgbm import LGBMRegressor
 import matplotlib.pyplot as plt
+from intermediate_store import load_stage
+from instrumentation import measure
 
 # === SETUP ===
 file_path = "INPUT YOUR FILE PATH HERE"
 output_dir = "INPUT YOUR FILE PATH HERE"
 os.makedirs(output_dir, exist_ok=True)
 
-df = pd.read_csv(file_path)
 feature_cols = [
     'log_distance_to_station', 'business_count', 'log_interaction',
     'year_of_transaction', 'railway_Control-NoStation', 'railway_Control-Station',
     'railway_Post', 'railway_Pre'
 ]
 target_col = 'log_real_price'
+df = load_stage(file_path, columns=feature_cols + [target_col, 'town/city'])
 
 towns = df['town/city'].dropna().unique()
 results = []
@@ -47,28 +49,32 @@ for test_town in towns:
 
     # === Model 1: Linear Regression ===
     lr = LinearRegression()
-    lr.fit(X_train, y_train)
+    with measure(f"fit Linear Regression (test town {test_town})"):
+        lr.fit(X_train, y_train)
     y_pred_lr = lr.predict(X_test)
     res_lr = evaluate(y_test, y_pred_lr)
     res_lr.update({"Model": "Linear Regression", "Town": test_town})
 
     # === Model 2: Random Forest ===
     rf = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
-    rf.fit(X_train, y_train)
+    with measure(f"fit Random Forest (test town {test_town})"):
+        rf.fit(X_train, y_train)
     y_pred_rf = rf.predict(X_test)
     res_rf = evaluate(y_test, y_pred_rf)
     res_rf.update({"Model": "Random Forest", "Town": test_town})
 
     # === Model 3: XGBoost ===
     xgb_model = XGBRegressor(n_estimators=200, learning_rate=0.1, max_depth=6, random_state=42)
-    xgb_model.fit(X_train, y_train)
+    with measure(f"fit XGBoost (test town {test_town})"):
+        xgb_model.fit(X_train, y_train)
     y_pred_xgb = xgb_model.predict(X_test)
     res_xgb = evaluate(y_test, y_pred_xgb)
     res_xgb.update({"Model": "XGBoost", "Town": test_town})
 
     # === Model 4: LightGBM ===
     lgbm_model = LGBMRegressor(n_estimators=200, learning_rate=0.1, max_depth=6, random_state=42)
-    lgbm_model.fit(X_train, y_train)
+    with measure(f"fit LightGBM (test town {test_town})"):
+        lgbm_model.fit(X_train, y_train)
     y_pred_lgbm = lgbm_model.predict(X_test)
     res_lgbm = evaluate(y_test, y_pred_lgbm)
     res_lgbm.update({"Model": "LightGBM", "Town": test_town})
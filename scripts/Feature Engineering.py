@@ -1,13 +1,19 @@
 import pandas as pd
 import numpy as np
-import os
+from features import FeatureFrame
+from intermediate_store import load_stage, save_stage
 
 # === Paths ===
 input_path = "INPUT YOUR FILE PATH HERE"
 output_path = "INPUT YOUR FILE PATH HERE"
+feature_cache_dir = None  # directory for cached feature columns, None to disable
+spatial_features_file = None  # optional output of spatial_features.py (path), None to skip
 
 # === Load Data ===
-df = pd.read_csv(input_path, low_memory=False)
+df = load_stage(input_path, columns=[
+    'price', 'real_price', 'distance_to_station', 'business_count', 'date_of_transfer',
+    'railway_period', 'town/city', 'postcode', 'postcode_id'
+])
 
 # === Basic Cleaning ===
 df['price'] = pd.to_numeric(df['price'], errors='coerce')
@@ -15,7 +21,7 @@ df['real_price'] = pd.to_numeric(df['real_price'], errors='coerce')
 df['distance_to_station'] = pd.to_numeric(df['distance_to_station'], errors='coerce')
 df['business_count'] = pd.to_numeric(df['business_count'].astype(str).str.replace(',', ''), errors='coerce')
 df['year_of_transaction'] = pd.to_datetime(df['date_of_transfer'], errors='coerce').dt.year
-df['railway_period'] = df['railway_period'].fillna('Unknown').astype(str)
+df['railway_period'] = df['railway_period'].astype(object).fillna('Unknown').astype(str)
 df['town/city'] = df['town/city'].astype(str).str.upper()
 
 # === Drop rows with key missing values ===
@@ -24,11 +30,20 @@ df = df.dropna(subset=[
 ])
 df = df[df['real_price'] < 2_000_000]
 
-# === Feature Engineering ===
-df['log_real_price'] = np.log1p(df['real_price'])
-df['log_distance_to_station'] = np.log1p(df['distance_to_station'])
-df['interaction'] = df['distance_to_station'] * df['business_count']
-df['log_interaction'] = np.log1p(df['interaction'])
+# === Feature Engineering (definitions in features.py) ===
+df = FeatureFrame(df, feature_cache_dir).add([
+    'log_real_price', 'log_distance_to_station', 'interaction', 'log_interaction'
+], verbose=True)
+
+# === Optional: station density, k-nearest and bus-stop features (per postcode) ===
+spatial_cols = []
+if spatial_features_file:
+    spatial = load_stage(spatial_features_file)
+    df = df.merge(spatial, on='postcode_id', how='left')
+    for col in [c for c in spatial.columns if c.startswith('distance_to_station_')]:
+        df[f'log_{col}'] = np.log1p(df[col])
+        spatial_cols.append(f'log_{col}')
+    spatial_cols += [c for c in spatial.columns if '_within_' in c]
 
 # Optional: Create time-based bins (e.g. before/after 2015)
 df['period_group'] = pd.cut(df['year_of_transaction'],
@@ -46,7 +61,8 @@ feature_cols = [
     'log_interaction',
     'year_of_transaction',
     # 'period_group',  # optionally use categorical encoding if needed
-    *railway_dummies.columns
+    *railway_dummies.columns,
+    *spatial_cols
 ]
 target_col = 'log_real_price'
 
@@ -59,7 +75,6 @@ df_model = df[feature_cols + [
     'postcode',
     'date_of_transfer'
 ]]
-os.makedirs(os.path.dirname(output_path), exist_ok=True)
-df_model.to_csv(output_path, index=False)
+save_stage(df_model, output_path)
 
 print(f"Final model-ready dataset saved to:\n{output_path}")
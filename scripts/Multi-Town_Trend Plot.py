@@ -2,6 +2,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 from matplotlib.lines import Line2D
+from intermediate_store import load_stage
 
 # === Setup ===
 file_path = "INPUT YOUR FILE PATH HERE"
@@ -9,7 +10,7 @@ output_folder = "INPUT YOUR FILE PATH HERE"
 os.makedirs(output_folder, exist_ok=True)
 
 # === Load & Clean ===
-df = pd.read_csv(file_path, low_memory=False)
+df = load_stage(file_path, columns=['real_price', 'date_of_transfer', 'town/city'])
 df['real_price'] = pd.to_numeric(df['real_price'], errors='coerce')
 df['year_of_transaction'] = pd.to_datetime(df['date_of_transfer'], errors='coerce').dt.year
 df['town/city'] = df['town/city'].str.upper().str.strip()
@@ -1,51 +1,90 @@
 import pandas as pd
-import numpy as np
-from scipy.stats.mstats import winsorize
-import os
+from features import FeatureFrame
+from intermediate_store import load_stage, save_stage, iter_stage, stage_columns, StageWriter
+from quantiles import (SketchSet, iqr_bounds_exact, winsor_bounds_exact,
+                       within_bounds, clip_to_bounds)
 
 # === Paths ===
 input_path = "INPUT YOUR FILE PATH HERE"
 output_path = "INPUT YOUR FILE PATH HERE"
 
-# === Load data ===
-df = pd.read_csv(input_path, low_memory=False)
-df['town/city'] = df['town/city'].str.upper()
+# === Quantile settings ===
+# "exact":     whole table in memory, exact quantiles (matches scipy winsorize)
+# "streaming": chunked passes with mergeable KLL sketches, for tables that do not fit
+mode = "exact"
+group_by = None          # e.g. 'town/city' or 'railway_period' for per-group caps
+batch_size = 500_000     # rows per chunk in streaming mode
+sketch_k = 2000          # KLL accuracy parameter (rank error ~ 1.7 / k)
+
+outlier_cols = ['real_price', 'distance_to_station', 'business_count']
+winsor_cols = {'real_price': 'real_price_win',
+               'distance_to_station': 'distance_win',
+               'business_count': 'business_count_win'}
+winsor_limits = (0.01, 0.01)
+log_cols = ['log_price', 'log_distance', 'log_business']
 
 # === Manual caps: extreme filter ===
-df = df[
-    df['real_price'].notna() &
-    df['distance_to_station'].notna() &
-    df['business_count'].notna() &
-    (df['real_price'] < 2_000_000) &
-    (df['distance_to_station'] < 20000)
-].copy()
-
-# === IQR Filter function ===
-def iqr_filter(series):
-    Q1 = series.quantile(0.25)
-    Q3 = series.quantile(0.75)
-    IQR = Q3 - Q1
-    return series.between(Q1 - 1.5 * IQR, Q3 + 1.5 * IQR)
-
-# === Apply IQR filtering ===
-iqr_mask = (
-    iqr_filter(df['real_price']) &
-    iqr_filter(df['distance_to_station']) &
-    iqr_filter(df['business_count'])
-)
-df_iqr = df[iqr_mask].copy()
-
-# === Winsorization (soft cap) ===
-df_iqr['real_price_win'] = winsorize(df_iqr['real_price'], limits=[0.01, 0.01])
-df_iqr['distance_win'] = winsorize(df_iqr['distance_to_station'], limits=[0.01, 0.01])
-df_iqr['business_count_win'] = winsorize(df_iqr['business_count'], limits=[0.01, 0.01])
-
-# === Log-transform ===
-df_iqr['log_price'] = np.log1p(df_iqr['real_price_win'])
-df_iqr['log_distance'] = np.log1p(df_iqr['distance_win'])
-df_iqr['log_business'] = np.log1p(df_iqr['business_count_win'])
-
-# === Save cleaned and transformed data ===
-os.makedirs(os.path.dirname(output_path), exist_ok=True)
-df_iqr.to_csv(output_path, index=False)
+def manual_caps(df):
+    df['town/city'] = df['town/city'].str.upper()
+    return df[
+        df['real_price'].notna() &
+        df['distance_to_station'].notna() &
+        df['business_count'].notna() &
+        (df['real_price'] < 2_000_000) &
+        (df['distance_to_station'] < 20000)
+    ].copy()
+
+# === Winsorization (soft cap) + Log-transform ===
+# The source columns are capped too: scipy's winsorize used to clip them in place,
+# and Feature Engineering.py builds its log features from them.
+def winsorize_and_log(df_iqr, winsor_bounds):
+    for col, win_col in winsor_cols.items():
+        df_iqr[win_col] = clip_to_bounds(df_iqr, winsor_bounds, col, group_by)
+        df_iqr[col] = df_iqr[win_col]
+    return FeatureFrame(df_iqr).add(log_cols)
+
+if mode == "exact":
+    # === Load data ===
+    df = manual_caps(load_stage(input_path))
+
+    # === IQR filtering: Q1/Q3 of all columns in one call ===
+    iqr_bounds = iqr_bounds_exact(df, outlier_cols, group_by)
+    df_iqr = df[within_bounds(df, iqr_bounds, outlier_cols, group_by)].copy()
+
+    # === Winsorization limits from one partial sort per column ===
+    winsor_bounds = winsor_bounds_exact(df_iqr, outlier_cols, winsor_limits, group_by)
+    df_iqr = winsorize_and_log(df_iqr, winsor_bounds)
+
+    # === Save cleaned and transformed data ===
+    save_stage(df_iqr, output_path)
+
+elif mode == "streaming":
+    # === Pass 1: Q1/Q3 sketches for every column (and group) ===
+    iqr_sketches = SketchSet(outlier_cols, group_by, sketch_k)
+    for chunk in iter_stage(input_path, batch_size=batch_size):
+        iqr_sketches.update(manual_caps(chunk))
+    iqr_bounds = iqr_sketches.bounds(0.25, 0.75, whisker=1.5)
+
+    # === Pass 2: winsorization limits on the IQR-filtered rows ===
+    # (they depend on the joint IQR mask, so they need their own pass)
+    winsor_sketches = SketchSet(outlier_cols, group_by, sketch_k)
+    for chunk in iter_stage(input_path, batch_size=batch_size):
+        chunk = manual_caps(chunk)
+        winsor_sketches.update(chunk[within_bounds(chunk, iqr_bounds, outlier_cols, group_by)])
+    winsor_bounds = winsor_sketches.bounds(winsor_limits[0], 1 - winsor_limits[1])
+
+    # === Pass 3: apply caps and stream the result out ===
+    writer = StageWriter(output_path)
+    for chunk in iter_stage(input_path, batch_size=batch_size):
+        chunk = manual_caps(chunk)
+        df_iqr = chunk[within_bounds(chunk, iqr_bounds, outlier_cols, group_by)].copy()
+        if not df_iqr.empty:
+            writer.write(winsorize_and_log(df_iqr, winsor_bounds))
+    # Header-only output if the filters drop every row
+    writer.close(empty_frame=pd.DataFrame(
+        columns=[*stage_columns(input_path), *winsor_cols.values(), *log_cols]))
+
+else:
+    raise ValueError(f"Unknown mode: {mode!r} (expected 'exact' or 'streaming')")
+
 print(f"Cleaned + winsorized + log-transformed dataset saved to:\n{output_path}")
@@ -8,15 +8,14 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
 import xgboost as xgb
 from lightgbm import LGBMRegressor
+from intermediate_store import load_stage, stage_columns
+from instrumentation import measure
 
 # === Paths ===
 file_path = "INPUT YOUR FILE PATH HERE"
 output_folder = "INPUT YOUR FILE PATH HERE"
 os.makedirs(output_folder, exist_ok=True)
 
-# === Load Data ===
-df = pd.read_csv(file_path)
-
 # === Features & Target ===
 feature_cols = [
     'log_distance_to_station',
@@ -30,6 +29,15 @@ feature_cols = [
 ]
 target_col = 'log_real_price'
 
+# === Spatial features (from spatial_features.py), used when present in the dataset ===
+feature_cols += [
+    col for col in stage_columns(file_path)
+    if col.startswith('log_distance_to_station_') or '_within_' in col
+]
+
+# === Load Data (only the columns used below) ===
+df = load_stage(file_path, columns=feature_cols + [target_col, 'town/city', 'postcode', 'date_of_transfer'])
+
 X = df[feature_cols]
 y = df[target_col]
 
@@ -72,7 +80,8 @@ results = []
 model_objects = {}
 
 for name, model in models.items():
-    model.fit(X_train, y_train)
+    with measure(f"fit {name}"):
+        model.fit(X_train, y_train)
     y_pred = model.predict(X_test)
     results.append(evaluate_model(name, y_test, y_pred))
     plot_preds(y_test, y_pred, name)
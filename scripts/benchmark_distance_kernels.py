@@ -0,0 +1,32 @@
+import time
+import numpy as np
+from geopy.distance import geodesic
+from distance_kernels import METHODS
+
+# === Settings ===
+n_pairs = 1_000_000     # pairs for the vectorized kernels
+n_geopy = 20_000        # geopy is one pair per call, so use a subsample
+max_offset_deg = 0.3    # pairs within roughly 30 km, as in station lookups
+rng = np.random.default_rng(42)
+
+# === Random pairs across England and Wales ===
+lat1 = rng.uniform(50.0, 55.5, n_pairs)
+lon1 = rng.uniform(-5.5, 1.7, n_pairs)
+lat2 = lat1 + rng.uniform(-max_offset_deg, max_offset_deg, n_pairs)
+lon2 = lon1 + rng.uniform(-max_offset_deg, max_offset_deg, n_pairs)
+
+# === Reference: geopy geodesic (Karney) ===
+start = time.perf_counter()
+reference = np.array([geodesic((a, b), (c, d)).meters
+                      for a, b, c, d in zip(lat1[:n_geopy], lon1[:n_geopy], lat2[:n_geopy], lon2[:n_geopy])])
+seconds = time.perf_counter() - start
+print(f"{'geopy':>9}: {n_geopy / seconds:>14,.0f} pairs/s")
+
+# === Vectorized kernels: throughput and deviation from geopy ===
+for name, kernel in METHODS.items():
+    start = time.perf_counter()
+    distances = kernel(lat1, lon1, lat2, lon2)
+    seconds = time.perf_counter() - start
+    deviation = np.abs(distances[:n_geopy] - reference)
+    print(f"{name:>9}: {n_pairs / seconds:>14,.0f} pairs/s | "
+          f"max deviation from geopy {deviation.max():.6f} m | mean {deviation.mean():.6f} m")
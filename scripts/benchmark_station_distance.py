@@ -0,0 +1,42 @@
+import time
+import numpy as np
+from intermediate_store import load_stage
+from station_index import StationIndex, BNGStationIndex
+
+# === File Paths ===
+postcode_file = "INPUT YOUR FILE PATH HERE"  # Code-Point table saved by merge_codepoint_latlon.py
+station_file = "INPUT YOUR FILE PATH HERE"
+
+# Compare the haversine BallTree path with the BNG KD-tree path on the same postcodes
+
+# === Load Data ===
+df_post = load_stage(postcode_file, columns=['Easting', 'Northing', 'Latitude', 'Longitude'])
+df_post = df_post.dropna().reset_index(drop=True)
+df_station = load_stage(station_file)
+df_station = df_station.dropna(subset=['Latitude', 'Longitude', 'creation_year'])
+
+# === Time build + query for each mode ===
+results = {}
+for name, index_class, x_col, y_col in [
+    ('haversine', StationIndex, 'Latitude', 'Longitude'),
+    ('bng', BNGStationIndex, 'Easting', 'Northing'),
+]:
+    start = time.perf_counter()
+    index = index_class.from_frame(df_station)
+    built = time.perf_counter()
+    distances_km, indices = index.query(df_post[x_col].to_numpy(), df_post[y_col].to_numpy())
+    done = time.perf_counter()
+    results[name] = (distances_km[:, 0] * 1000, indices[:, 0])
+    print(f"{name:>9}: build {built - start:.3f}s | query {done - built:.3f}s "
+          f"| {len(df_post) / (done - built):,.0f} postcodes/s")
+
+# === Accuracy of BNG against haversine ===
+hav_m, hav_idx = results['haversine']
+bng_m, bng_idx = results['bng']
+diff = np.abs(bng_m - hav_m)
+print(f"\nDistance difference (m): mean {diff.mean():.2f} | p99 {np.percentile(diff, 99):.2f} | max {diff.max():.2f}")
+print(f"Nearest station differs for {np.mean(hav_idx != bng_idx):.4%} of postcodes")
+for limit in [2_000, 5_000, 20_000]:
+    within = hav_m < limit
+    if within.any():
+        print(f"  within {limit / 1000:.0f} km: max difference {diff[within].max():.2f} m")
@@ -1,32 +1,67 @@
 import pandas as pd
+from intermediate_store import save_stage, count_read
 
 naptan_file = "INPUT YOUR FILE PATH HERE"
-naptan = pd.read_csv(naptan_file, low_memory=False)
+output_path = "INPUT YOUR FILE PATH HERE"           # active rail stations (station table)
+history_output_path = "INPUT YOUR FILE PATH HERE"   # every rail stop with status and dates
+bus_stop_output_path = "INPUT YOUR FILE PATH HERE"
 
-# Filter only railway stations with StopType 'RSE' or 'RLY'
-rail_stations = naptan[naptan['StopType'].isin(['RSE', 'RLY'])].copy()
+# === Streaming settings ===
+chunk_size = 200_000
 
-# Extract creation year from CreationDateTime column
-rail_stations['creation_year'] = pd.to_datetime(
-    rail_stations['CreationDateTime'], errors='coerce').dt.year
+rail_types = ['RSE', 'RLY']
+bus_types = ['BCT', 'BCS', 'BCQ']  # on-street, bay and variable-bay bus stops
 
-# Filter status: only active stations
-rail_stations = rail_stations[
-    rail_stations['Status'].str.lower().isin(['active', 'act'])
-]
+# Only the columns used below are parsed
+usecols = ['ATCOCode', 'CommonName', 'LocalityName', 'Town', 'Latitude', 'Longitude',
+           'StopType', 'Status', 'CreationDateTime', 'ModificationDateTime']
+dtypes = {col: 'str' for col in usecols}
+dtypes['Latitude'] = 'float64'
+dtypes['Longitude'] = 'float64'
 
-# Drop rows missing latitude, longitude, or creation_year
-rail_stations = rail_stations.dropna(subset=['Latitude', 'Longitude', 'creation_year'])
+# === Read NaPTAN in chunks, keeping rail and bus stops only ===
+rail_chunks = []
+bus_chunks = []
+count_read(0, naptan_file)
+for chunk in pd.read_csv(naptan_file, usecols=usecols, dtype=dtypes, chunksize=chunk_size):
+    count_read(len(chunk))
+    rail_chunks.append(chunk[chunk['StopType'].isin(rail_types)])
+    bus_chunks.append(chunk[chunk['StopType'].isin(bus_types)])
 
-# Keep useful columns only
-rail_stations = rail_stations[['CommonName', 'LocalityName',
-                               'Town', 'Latitude', 'Longitude', 'creation_year']]
+rail_stops = pd.concat(rail_chunks, ignore_index=True)
+bus_stops = pd.concat(bus_chunks, ignore_index=True)
 
-# Drop duplicates based on station name
-rail_stations = rail_stations.drop_duplicates(subset=['CommonName'])
+# === Station history keyed by ATCOCode (not CommonName, which merges namesakes) ===
+rail_stops['creation_date'] = pd.to_datetime(rail_stops['CreationDateTime'], errors='coerce')
+rail_stops['modification_date'] = pd.to_datetime(rail_stops['ModificationDateTime'], errors='coerce')
+rail_stops['creation_year'] = rail_stops['creation_date'].dt.year
+rail_stops['Status'] = rail_stops['Status'].str.lower()
 
-# Save output file
-output_path = "INPUT YOUR FILE PATH HERE"
-rail_stations.to_csv(output_path, index=False)
+# One row per ATCOCode: keep the most recently modified record
+history = (
+    rail_stops
+    .sort_values('modification_date', na_position='first')
+    .drop_duplicates(subset=['ATCOCode'], keep='last')
+    .dropna(subset=['Latitude', 'Longitude', 'creation_year'])
+    [['ATCOCode', 'CommonName', 'LocalityName', 'Town', 'Latitude', 'Longitude',
+      'StopType', 'Status', 'creation_date', 'modification_date', 'creation_year']]
+    .sort_values('ATCOCode')
+    .reset_index(drop=True)
+)
+# Inactive stops are treated as closed from their last modification: [creation_date, closed_date)
+history['closed_date'] = history['modification_date'].where(~history['Status'].isin(['active', 'act']))
+save_stage(history, history_output_path)
+print(f"Station history ({len(history):,} rail stops) saved to {history_output_path}")
 
-print(f"rail_stations_with_year.csv saved to {output_path}")
+# === Active stations only ===
+rail_stations = history[history['Status'].isin(['active', 'act'])]
+save_stage(rail_stations, output_path)
+print(f"rail_stations_with_year ({len(rail_stations):,} active stations) saved to {output_path}")
+
+# === Bus stops for bus-stop density features ===
+bus_stops = bus_stops[bus_stops['Status'].str.lower().isin(['active', 'act'])]
+bus_stops = bus_stops.dropna(subset=['Latitude', 'Longitude'])
+bus_stops = bus_stops[['ATCOCode', 'CommonName', 'Latitude', 'Longitude']]
+save_stage(bus_stops, bus_stop_output_path)
+
+print(f"{len(bus_stops):,} bus stops saved to {bus_stop_output_path}")
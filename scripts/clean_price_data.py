@@ -1,64 +1,45 @@
 import pandas as pd
-import os
+from intermediate_store import StageWriter
+from price_paid import read_price_paid, clean_chunk, output_columns
 
 # === Paths ===
 input_path = "INPUT YOUR FILE PATH HERE"
 output_path = "INPUT YOUR FILE PATH HERE"
-# === Column Definitions & Load ===
-columns = [
-    'transaction_unique_identifier','price','date_of_transfer','postcode',
-    'property_type','old_new','duration','paon','saon','street','locality',
-    'town/city','district','county','ppd_category_type','record_status'
-]
-df = pd.read_csv(input_path, header=None, usecols=range(16))
-df.columns = columns
 
-# === Clean & Standardize ===
-df['date_of_transfer'] = pd.to_datetime(df['date_of_transfer'], errors='coerce')
-df['town/city'] = df['town/city'].astype(str).str.upper()
-
-# === Extract Year of Transaction ===
-df['year_of_transaction'] = df['date_of_transfer'].dt.year
-
-# === Define Town Groups (exclude PETERLEE) ===
-core_towns = ['CORBY','BICESTER','KENILWORTH']
-always_station = ['REDDITCH','KETTERING']
-no_station = ['WISBECH','RUSHDEN']  # ตัด PETERLEE ออก
-
-target_cities = core_towns + always_station + no_station
-
-# === Filter Selected Towns only (ไม่กรองปี) ===
-df_filtered = df[
-    (df['town/city'].isin(target_cities))
-].copy()
-
-# === Assign Period Labels ===
-def assign_period(row):
-    town = row['town/city']
-    date = row['date_of_transfer']
-    if pd.isna(date):
-        return 'Unknown'
-    if town == 'CORBY':
-        return 'Pre' if date < pd.Timestamp('2009-02-01') else 'Post'
-    if town == 'BICESTER':
-        return 'Pre' if date < pd.Timestamp('2016-12-01') else 'Post'
-    if town == 'KENILWORTH':
-        return 'Pre' if date < pd.Timestamp('2018-04-30') else 'Post'
-    if town in always_station:
-        return 'Control-Station'
-    if town in no_station:
-        return 'Control-NoStation'
-    return 'Unknown'
-
-df_filtered['railway_period'] = df_filtered.apply(assign_period, axis=1)
-
-# === Save Updated Dataset ===
-os.makedirs(os.path.dirname(output_path), exist_ok=True)
-df_filtered.to_csv(output_path, index=False)
+# === Streaming settings ===
+# Rows per chunk; peak memory is bounded by this rather than the file size.
+# Set to None to load the whole file at once.
+chunk_size = 1_000_000
+
+# === Stream, Filter & Save Incrementally ===
+# Schema, study towns (station_openings.csv) and period labels live in price_paid.py
+writer = StageWriter(output_path)
+group_counts = []
+rows_read = 0
+rows_kept = 0
+
+for chunk in read_price_paid(input_path, chunk_size):
+    rows_read += len(chunk)
+    df_filtered = clean_chunk(chunk)
+    if df_filtered.empty:
+        continue
+    writer.write(df_filtered)
+    rows_kept += len(df_filtered)
+    group_counts.append(df_filtered.groupby(['town/city','railway_period']).size())
+
+# No matching rows: still write an empty file with the expected header
+writer.close(empty_frame=pd.DataFrame(columns=output_columns))
 
 # === Summaries ===
+if group_counts:
+    town_period_counts = pd.concat(group_counts).groupby(level=[0, 1]).sum()
+else:
+    town_period_counts = pd.Series(dtype='int64')
+period_counts = town_period_counts.groupby(level=1).sum().sort_values(ascending=False) if group_counts else town_period_counts
+
 print("Updated dataset saved to:", output_path)
+print(f"Rows read: {rows_read:,} | rows kept: {rows_kept:,}")
 print("\nCounts by group:")
-print(df_filtered['railway_period'].value_counts())
+print(period_counts)
 print("\nCounts by town & period:")
-print(df_filtered.groupby(['town/city','railway_period']).size())
+print(town_period_counts)
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from pyproj import Transformer
+from intermediate_store import load_stage, save_stage, count_read
+
+
+def codepoint_files(codepoint_folder):
+    return sorted(f for f in os.listdir(codepoint_folder) if f.endswith(".csv"))
+
+
+def release_key(codepoint_folder):
+    """Fingerprint of a Code-Point Open release: file names, sizes and mtimes."""
+    digest = hashlib.sha1()
+    for file in codepoint_files(codepoint_folder):
+        stat = os.stat(os.path.join(codepoint_folder, file))
+        digest.update(f"{file}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+    return digest.hexdigest()[:16]
+
+
+def read_codepoint_file(path):
+    """Read one area file (postcode, easting, northing only) and time it."""
+    start = time.perf_counter()
+    df = pd.read_csv(
+        path, header=None, encoding='latin1',  # safer encoding
+        usecols=[0, 2, 3], names=['Postcode', 'Easting', 'Northing'],
+        dtype={'Postcode': 'str', 'Easting': 'float64', 'Northing': 'float64'},
+    )
+    return df, time.perf_counter() - start
+
+
+def read_codepoint(codepoint_folder, max_workers=None):
+    # Read the per-area Code-Point Open CSV files in parallel and combine once
+    files = codepoint_files(codepoint_folder)
+    paths = [os.path.join(codepoint_folder, file) for file in files]
+
+    df_list = []
+    timings = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(read_codepoint_file, path): file for path, file in zip(paths, files)}
+        for future in as_completed(futures):
+            file = futures[future]
+            try:
+                df, seconds = future.result()
+            except Exception as e:
+                print(f"Failed to read Code-Point file {file}: {e}")
+                raise
+            df_list.append((file, df))
+            count_read(len(df), os.path.join(codepoint_folder, file))
+            timings.append({'file': file, 'rows': len(df), 'seconds': round(seconds, 3)})
+
+    timings = pd.DataFrame(timings).sort_values('seconds', ascending=False)
+    print(f"Read {len(files)} Code-Point files, {timings['rows'].sum():,} rows")
+    print(timings.to_string(index=False))
+
+    # Concatenate in file order so the output does not depend on scheduling
+    df_list.sort(key=lambda item: item[0])
+    return pd.concat([df for _, df in df_list], ignore_index=True)
+
+
+def add_latlon(codepoint):
+    # Convert Easting/Northing to Latitude/Longitude in one bulk array call
+    transformer = Transformer.from_crs("epsg:27700", "epsg:4326", always_xy=True)
+    lon, lat = transformer.transform(codepoint['Easting'].to_numpy(dtype=float),
+                                     codepoint['Northing'].to_numpy(dtype=float))
+    codepoint['Longitude'] = lon
+    codepoint['Latitude'] = lat
+    return codepoint
+
+
+def load_codepoint(codepoint_folder, cache_dir=None, max_workers=None):
+    """Code-Point table with lat/lon, cached per source release in ``cache_dir``."""
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, f"codepoint_{release_key(codepoint_folder)}.parquet")
+        if os.path.exists(cache_path):
+            print(f"Loaded cached Code-Point table: {cache_path}")
+            return load_stage(cache_path)
+
+    codepoint = add_latlon(read_codepoint(codepoint_folder, max_workers=max_workers))
+    if cache_path:
+        save_stage(codepoint, cache_path)
+        print(f"Cached Code-Point table: {cache_path}")
+    return codepoint
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+CPI_COLUMN = 'cpi index 00: all items 2015=100'
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+
+class CPIDeflator:
+    """CPI held in contiguous arrays indexed by month offset and by year offset.
+
+    Built once from the ONS series (rows labelled ``YYYY``, ``YYYY Qn`` and
+    ``YYYY MON``); deflating is then one gather per granularity, and any
+    number of base periods can be applied to the same gathered index.
+    """
+
+    def __init__(self, inflation):
+        inflation = inflation.copy()
+        inflation.columns = inflation.columns.str.strip().str.lower()
+        label = inflation['year'].astype(str).str.strip().str.upper()
+        value = pd.to_numeric(inflation[CPI_COLUMN], errors='coerce')
+
+        # Annual: average of every row for the year, as the original annual CPI
+        year = pd.to_numeric(label.str.extract(r'(\d{4})')[0], errors='coerce')
+        annual = value.groupby(year).mean().dropna()
+        self.first_year = int(annual.index.min())
+        self.annual = np.full(int(annual.index.max()) - self.first_year + 1, np.nan)
+        self.annual[annual.index.astype(int) - self.first_year] = annual.to_numpy()
+
+        # Monthly: rows labelled "YYYY MON"
+        parts = label.str.extract(r'^(\d{4}) ([A-Z]{3})$')
+        month_num = parts[1].map({m: i for i, m in enumerate(MONTHS)})
+        month_offset = (pd.to_numeric(parts[0], errors='coerce') * 12 + month_num)
+        monthly = value[month_offset.notna()].groupby(month_offset[month_offset.notna()].astype(int)).mean()
+        if monthly.empty:
+            self.first_month = self.first_year * 12
+            self.monthly = np.full(0, np.nan)
+        else:
+            self.first_month = int(monthly.index.min())
+            self.monthly = np.full(int(monthly.index.max()) - self.first_month + 1, np.nan)
+            self.monthly[monthly.index.astype(int) - self.first_month] = monthly.to_numpy()
+
+    def _gather(self, array, offsets):
+        offsets = np.asarray(offsets, dtype=float)
+        out = np.full(len(offsets), np.nan)
+        valid = ~np.isnan(offsets) & (offsets >= 0) & (offsets < len(array))
+        out[valid] = array[offsets[valid].astype(np.int64)]
+        return out
+
+    def index_at(self, dates, granularity='annual'):
+        """CPI for each date at ``'annual'`` or ``'monthly'`` granularity."""
+        dates = pd.to_datetime(pd.Series(np.asarray(dates)), errors='coerce')
+        if granularity == 'annual':
+            return self._gather(self.annual, dates.dt.year.to_numpy(dtype=float) - self.first_year)
+        if granularity == 'monthly':
+            offsets = dates.dt.year.to_numpy(dtype=float) * 12 + dates.dt.month.to_numpy(dtype=float) - 1
+            return self._gather(self.monthly, offsets - self.first_month)
+        raise ValueError(f"Unknown granularity: {granularity!r} (expected 'annual' or 'monthly')")
+
+    def base_value(self, base):
+        """CPI of a base period: ``'2024'`` (annual average), ``'2024-06'`` (month) or a number (e.g. 100)."""
+        if isinstance(base, (int, float)):
+            return float(base)
+        if '-' in str(base):
+            return float(self.index_at([pd.Timestamp(f"{base}-01")], 'monthly')[0])
+        return float(self._gather(self.annual, [int(base) - self.first_year])[0])
+
+    def deflate(self, prices, dates, bases, granularity='annual'):
+        """Real prices for every base in ``bases`` (name -> base period) from one CPI gather."""
+        cpi = self.index_at(dates, granularity)
+        prices = np.asarray(prices, dtype=float)
+        return cpi, {name: prices * (self.base_value(base) / cpi) for name, base in bases.items()}
@@ -1,9 +1,11 @@
 import pandas as pd
-import numpy as np
+from features import FeatureFrame
+from intermediate_store import load_stage, save_stage
 
 # Load dataset
 input_file = "INPUT YOUR FILE PATH HERE"
-df = pd.read_csv(input_file, low_memory=False)
+feature_cache_dir = None  # directory for cached feature columns, None to disable
+df = load_stage(input_file)
 
 df['real_price'] = pd.to_numeric(df['real_price'], errors='coerce')
 df['business_count'] = pd.to_numeric(df['business_count'].astype(str).str.replace(',', ''), errors='coerce')
@@ -11,18 +13,15 @@ df['distance_to_station'] = pd.to_numeric(df['distance_to_station'], errors='coe
 
 df['business_count'] = df['business_count'].fillna(0)
 
-df_cleaned = df.dropna(subset=['real_price', 'distance_to_station'])
+df_cleaned = df.dropna(subset=['real_price', 'distance_to_station']).copy()
 
-# Create new interaction
-df_cleaned['distance_times_business'] = df_cleaned['distance_to_station'] * df_cleaned['business_count']
-df_cleaned['log_interaction'] = np.log1p(df_cleaned['distance_times_business'])
-
-# Create dummy variables
-df_cleaned['near_station'] = (df_cleaned['distance_to_station'] < 2000).astype(int)
-df_cleaned['business_dense'] = (df_cleaned['business_count'] > df_cleaned['business_count'].median()).astype(int)
-df_cleaned['target_area'] = (df_cleaned['near_station'] & df_cleaned['business_dense']).astype(int)
+# Create new interaction + dummy variables (definitions in features.py)
+df_cleaned = FeatureFrame(df_cleaned, feature_cache_dir).add([
+    'distance_times_business', 'log_interaction',
+    'near_station', 'business_dense', 'target_area',
+], verbose=True)
 
 # Save File
 output_file = "INPUT YOUR FILE PATH HERE"
-df_cleaned.to_csv(output_file, index=False)
+save_stage(df_cleaned, output_file)
 print(f"Dataset with imputed business_count saved to:\n{output_file}")
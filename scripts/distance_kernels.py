@@ -0,0 +1,87 @@
+import numpy as np
+from pyproj import Transformer
+
+# === Vectorized point-to-point distances (metres) ===
+# Every kernel takes arrays of pairs: (lat1, lon1) -> (lat2, lon2) in degrees.
+
+EARTH_RADIUS_M = 6_371_000
+
+# WGS84 ellipsoid
+WGS84_A = 6_378_137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance on a sphere of radius 6371 km."""
+    phi1, lam1, phi2, lam2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def vincenty(lat1, lon1, lat2, lon2, max_iter=200, tol=1e-12):
+    """Ellipsoidal (WGS84) distance by Vincenty's inverse formula, iterated on whole arrays.
+
+    Agrees with geopy's Karney ``geodesic`` to well under a millimetre for
+    non-antipodal points, which covers every pair within Great Britain.
+    """
+    phi1, lam1, phi2, lam2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    f = WGS84_F
+    U1 = np.arctan((1 - f) * np.tan(phi1))
+    U2 = np.arctan((1 - f) * np.tan(phi2))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+    L = lam2 - lam1
+
+    lam = L.copy()
+    for _ in range(max_iter):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.sqrt((cosU2 * sin_lam) ** 2 + (cosU1 * sinU2 - sinU1 * cosU2 * cos_lam) ** 2)
+        cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+        C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+        lam_prev = lam
+        lam = L + (1 - C) * f * sin_alpha * (
+            sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+        if np.all(np.abs(lam - lam_prev) < tol):
+            break
+
+    u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+    return WGS84_B * A * (sigma - delta_sigma)
+
+
+def to_bng(lat, lon):
+    """Project WGS84 lat/lon to British National Grid easting/northing (metres)."""
+    transformer = Transformer.from_crs("epsg:4326", "epsg:27700", always_xy=True)
+    easting, northing = transformer.transform(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+    return np.asarray(easting), np.asarray(northing)
+
+
+def bng(lat1, lon1, lat2, lon2):
+    """Planar Euclidean distance after projecting both points to British National Grid."""
+    e1, n1 = to_bng(lat1, lon1)
+    e2, n2 = to_bng(lat2, lon2)
+    return np.hypot(e2 - e1, n2 - n1)
+
+
+METHODS = {
+    'haversine': haversine,
+    'vincenty': vincenty,
+    'bng': bng,
+}
+
+
+def pairwise_distance(method, lat1, lon1, lat2, lon2):
+    """Distance in metres between paired points using ``method`` (see ``METHODS``)."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown distance method: {method!r} (expected one of {sorted(METHODS)})")
+    return METHODS[method](lat1, lon1, lat2, lon2)
@@ -1,14 +1,24 @@
 import pandas as pd
-from geopy.distance import geodesic
+from station_index import TimeAwareStationIndex, StationIntervalIndex, load_or_build_index
+from intermediate_store import load_stage, save_stage
 
 # === Paths ===
 property_file = "INPUT YOUR FILE PATH HERE"
-station_file = "INPUT YOUR FILE PATH HERE"
+station_file = "INPUT YOUR FILE PATH HERE"  # station table, or the station history table for "date"
+station_index_file = "INPUT YOUR FILE PATH HERE"  # persisted index, rebuilt when station_file changes
 output_file = "INPUT YOUR FILE PATH HERE"
 
+# === Distance method: "vincenty" (ellipsoidal, matches geopy geodesic), "haversine" or "bng" ===
+distance_method = "vincenty"
+
+# === Time resolution ===
+# "year":  stations with creation_year <= year of transaction (one tree per opening year)
+# "date":  stations open over [opened, closed) on the transfer date (station history table)
+time_resolution = "year"
+
 # === Load datasets ===
-properties = pd.read_csv(property_file)
-stations = pd.read_csv(station_file)
+properties = load_stage(property_file)
+stations = load_stage(station_file)
 
 # === Convert coordinates to numeric and drop invalid rows ===
 for df in [properties, stations]:
@@ -26,31 +36,27 @@ properties = properties.dropna(subset=['year_of_transaction'])
 stations['creation_year'] = pd.to_numeric(stations['creation_year'], errors='coerce')
 stations = stations.dropna(subset=['creation_year'])
 
-# === Define distance calculation function ===
-def get_nearest_station_distance(row):
-    year = row['year_of_transaction']
-    prop_coord = (row['Latitude'], row['Longitude'])
-
-    # Filter stations that existed at that year
-    valid_stations = stations[stations['creation_year'] <= year]
-
-    if valid_stations.empty:
-        return None  # No station existed yet
-
-    try:
-        distances = valid_stations.apply(
-            lambda station: geodesic(prop_coord, (station['Latitude'], station['Longitude'])).meters,
-            axis=1
-        )
-        return distances.min()
-    except Exception as e:
-        print(f"Error on row {row.name}: {e}")
-        return None
+# === Load (or build once) the time-aware station index ===
+if time_resolution == "year":
+    build = lambda: TimeAwareStationIndex(stations, distance_method=distance_method)
+    index_class = TimeAwareStationIndex
+    when = properties['year_of_transaction']
+else:
+    build = lambda: StationIntervalIndex(stations, distance_method=distance_method)
+    index_class = StationIntervalIndex
+    when = pd.to_datetime(properties['date_of_transfer'], errors='coerce')
+station_index = load_or_build_index(station_index_file, station_file, build, kind=index_class)
+station_index.distance_method = distance_method
 
 # === Apply distance calculation ===
 print("Calculating time-aware distance to nearest station...")
-properties['distance_to_station'] = properties.apply(get_nearest_station_distance, axis=1)
+# Computed once per unique (postcode_id, snapshot) and broadcast back
+nearest = station_index.query_by_postcode(
+    properties['postcode_id'], properties['Latitude'], properties['Longitude'], when
+)
+nearest.index = properties.index
+properties[['distance_to_station', 'nearest_station_name', 'nearest_station_id']] = nearest
 
 # === Save the result ===
-properties.to_csv(output_file, index=False)
+save_stage(properties, output_file)
 print(f"Done: Distance column added and saved to:\n{output_file}")
@@ -5,6 +5,7 @@ from matplotlib.ticker import FuncFormatter
 from scipy.stats import kruskal
 import os
 import numpy as np
+from intermediate_store import load_stage
 
 # === Setup ===
 file_path = "INPUT YOUR FILE PATH HERE"
@@ -12,13 +13,16 @@ output_folder = "INPUT YOUR FILE PATH HERE"
 os.makedirs(output_folder, exist_ok=True)
 
 # === Load Data ===
-df = pd.read_csv(file_path, low_memory=False)
+df = load_stage(file_path, columns=[
+    'price', 'real_price', 'business_count', 'railway_period', 'date_of_transfer',
+    'distance_to_station', 'log_price', 'log_distance'
+])
 
 # === Basic Cleaning ===
 df['price'] = pd.to_numeric(df['price'], errors='coerce')
 df['real_price'] = pd.to_numeric(df['real_price'], errors='coerce')
 df['business_count'] = pd.to_numeric(df['business_count'], errors='coerce')
-df['railway_period'] = df['railway_period'].fillna('Unknown')
+df['railway_period'] = df['railway_period'].astype(object).fillna('Unknown')
 df['year_of_transaction'] = pd.to_datetime(df['date_of_transfer'], errors='coerce').dt.year
 
 sns.set(style="whitegrid")
@@ -110,7 +114,7 @@ plt.close()
 
 # === 8. Kruskal-Wallis Test on Real Price by Railway Period ===
 df_filtered = df[df['real_price'] < 2_000_000].copy()
-groups = [g["real_price"].dropna() for _, g in df_filtered.groupby("railway_period")]
+groups = [g["real_price"].dropna() for _, g in df_filtered.groupby("railway_period", observed=True)]
 stat, p = kruskal(*groups)
 with open(f"{output_folder}/Kruskal_InflationPrice_Result.txt", "w") as f:
     f.write("📊 Kruskal-Wallis Test on Inflation-adjusted Price:\n")
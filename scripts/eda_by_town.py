@@ -2,6 +2,7 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import os
+from intermediate_store import load_stage
 
 # === Setup ===
 file_path = "INPUT YOUR FILE PATH HERE"
@@ -9,12 +10,14 @@ output_folder = "INPUT YOUR FILE PATH HERE"
 os.makedirs(output_folder, exist_ok=True)
 
 # === Load Data ===
-df = pd.read_csv(file_path, low_memory=False)
+df = load_stage(file_path, columns=[
+    'price', 'business_count', 'railway_period', 'date_of_transfer', 'town/city', 'distance_to_station'
+])
 
 # === Clean Columns ===
 df['real_price'] = pd.to_numeric(df['price'], errors='coerce')
 df['business_count'] = pd.to_numeric(df['business_count'].astype(str).str.replace(',', ''), errors='coerce')
-df['railway_period'] = df['railway_period'].fillna('Unknown')
+df['railway_period'] = df['railway_period'].astype(object).fillna('Unknown')
 df['year_of_transaction'] = pd.to_datetime(df['date_of_transfer'], errors='coerce').dt.year
 df['town/city'] = df['town/city'].astype(str).str.upper().str.strip()
 
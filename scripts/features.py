@@ -0,0 +1,146 @@
+import hashlib
+import inspect
+import os
+import numpy as np
+import pandas as pd
+
+# === Feature registry ===
+# Each feature declares the columns it is computed from. A FeatureFrame
+# materialises only the features asked for (and their inputs), and can cache
+# every computed column on disk keyed by the hash of its inputs and definition.
+
+FEATURES = {}
+
+
+class Feature:
+    def __init__(self, name, inputs, func):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.func = func
+        self.definition = inspect.getsource(func)
+
+
+def feature(name, inputs):
+    def register(func):
+        FEATURES[name] = Feature(name, inputs, func)
+        return func
+    return register
+
+
+@feature('log_real_price', ['real_price'])
+def _log_real_price(real_price):
+    return np.log1p(real_price)
+
+
+@feature('log_distance_to_station', ['distance_to_station'])
+def _log_distance_to_station(distance):
+    return np.log1p(distance)
+
+
+@feature('interaction', ['distance_to_station', 'business_count'])
+def _interaction(distance, business_count):
+    return distance * business_count
+
+
+@feature('distance_times_business', ['interaction'])
+def _distance_times_business(interaction):
+    return interaction
+
+
+@feature('log_interaction', ['interaction'])
+def _log_interaction(interaction):
+    return np.log1p(interaction)
+
+
+@feature('near_station', ['distance_to_station'])
+def _near_station(distance):
+    return (distance < 2000).astype(int)
+
+
+@feature('business_dense', ['business_count'])
+def _business_dense(business_count):
+    return (business_count > business_count.median()).astype(int)
+
+
+@feature('target_area', ['near_station', 'business_dense'])
+def _target_area(near_station, business_dense):
+    return (near_station & business_dense).astype(int)
+
+
+@feature('log_price', ['real_price_win'])
+def _log_price(real_price_win):
+    return np.log1p(real_price_win)
+
+
+@feature('log_distance', ['distance_win'])
+def _log_distance(distance_win):
+    return np.log1p(distance_win)
+
+
+@feature('log_business', ['business_count_win'])
+def _log_business(business_count_win):
+    return np.log1p(business_count_win)
+
+
+class FeatureFrame:
+    """Lazily adds registered features to ``df``, with an optional column cache."""
+
+    def __init__(self, df, cache_dir=None):
+        self.df = df
+        self.cache_dir = cache_dir
+        self._keys = {}
+        self._values = {}
+        self.computed = []
+        self.cached = []
+
+    def key(self, name):
+        """Hash of a column: data hash for inputs, inputs + definition for features."""
+        if name not in self._keys:
+            digest = hashlib.sha1(name.encode())
+            if name not in self.df.columns and name in FEATURES:
+                spec = FEATURES[name]
+                digest.update(spec.definition.encode())
+                for dep in spec.inputs:
+                    digest.update(self.key(dep).encode())
+            else:
+                digest.update(pd.util.hash_pandas_object(self.df[name], index=True).to_numpy().tobytes())
+            self._keys[name] = digest.hexdigest()[:16]
+        return self._keys[name]
+
+    def _cache_path(self, name):
+        safe = name.replace('/', '_')
+        return os.path.join(self.cache_dir, f"{safe}-{self.key(name)}.parquet")
+
+    def get(self, name):
+        if name in self.df.columns:
+            return self.df[name]
+        if name in self._values:
+            return self._values[name]
+        if name not in FEATURES:
+            raise KeyError(f"{name!r} is neither a column nor a registered feature")
+
+        path = self._cache_path(name) if self.cache_dir else None
+        if path and os.path.exists(path):
+            values = pd.read_parquet(path)[name]
+            self.cached.append(name)
+        else:
+            spec = FEATURES[name]
+            values = spec.func(*[self.get(dep) for dep in spec.inputs])
+            self.computed.append(name)
+            if path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                values.rename(name).to_frame().to_parquet(path, index=True)
+        self._values[name] = values
+        return values
+
+    def add(self, names, verbose=False):
+        """Add ``names`` to the frame, computing only what they depend on.
+
+        ``verbose`` prints which features were computed or read from the cache.
+        """
+        for name in names:
+            if name not in self.df.columns:
+                self.df[name] = self.get(name)
+        if verbose and (self.computed or self.cached):
+            print(f"Features computed: {self.computed or '-'} | from cache: {self.cached or '-'}")
+        return self.df
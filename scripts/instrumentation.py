@@ -0,0 +1,210 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# === Lightweight stage instrumentation ===
+# ``measure`` wraps a pipeline stage or a model fit and records wall and CPU
+# time, peak RSS, rows in/out and bytes read/written through intermediate_store.
+# Worker processes (joblib/loky pools) are included: with psutil installed a
+# background thread samples this process and its children every
+# ``SAMPLE_SECONDS`` for the block's own peak RSS and the workers' CPU time.
+# Records collect in SECTIONS; the runner writes them to a JSON run report.
+#
+#   with measure("fit XGBoost"):
+#       model.fit(X_train, y_train)
+
+SECTIONS = []  # every finished measure() block in this process
+SAMPLE_SECONDS = 0.2
+MB = 1024 * 1024
+
+
+def lifetime_peak_rss_mb(who='self'):
+    """Peak RSS since process start (MB) of this process, or of its largest reaped child."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(usage.ru_maxrss / (MB if sys.platform == 'darwin' else 1024), 1)
+
+
+def _reaped_children_cpu():
+    """CPU seconds of child processes that have exited and been waited for."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class _ProcessSampler:
+    """Samples RSS of this process plus all live descendants, and the descendants' CPU."""
+
+    def __init__(self):
+        self.peak_rss = 0
+        self._me = psutil.Process()
+        # Children that exit or deny access return None and are left out
+        self._baseline = {pid: cpu for pid, cpu in ((child.pid, self._cpu(child)) for child in self._children())
+                          if cpu is not None}
+        self._last = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _children(self):
+        try:
+            return self._me.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    @staticmethod
+    def _cpu(proc):
+        try:
+            times = proc.cpu_times()
+            return times.user + times.system
+        except psutil.Error:
+            return None
+
+    def sample(self):
+        total = self._me.memory_info().rss
+        for child in self._children():
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+            cpu = self._cpu(child)
+            if cpu is not None:
+                self._last[child.pid] = cpu
+        self.peak_rss = max(self.peak_rss, total)
+
+    def _run(self):
+        while not self._stop.wait(SAMPLE_SECONDS):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def children_cpu(self):
+        """CPU seconds spent by descendants during the block (as of their last sample)."""
+        return sum(cpu - self._baseline.get(pid, 0.0) for pid, cpu in self._last.items())
+
+
+def _store_io():
+    """Row/byte counters of intermediate_store, once a script has imported it."""
+    store = sys.modules.get('intermediate_store')
+    if store is None:
+        return {'rows_in': 0, 'rows_out': 0, 'bytes_read': 0, 'bytes_written': 0}
+    return dict(store.IO_STATS)
+
+
+def _os_io():
+    """Bytes read/written by any means (raw CSVs included), where /proc exposes them."""
+    try:
+        with open('/proc/self/io') as f:
+            fields = dict(line.split(': ') for line in f.read().splitlines())
+        return {'os_bytes_read': int(fields['rchar']), 'os_bytes_written': int(fields['wchar'])}
+    except (OSError, KeyError, ValueError):
+        return {}
+
+
+class measure:
+    """Context manager recording the cost of a block into ``SECTIONS``.
+
+    ``profile_path`` captures a cProfile of the block there (and prints the
+    top functions by cumulative time); ``report_path`` writes this record and
+    every nested one as JSON.
+    """
+
+    def __init__(self, name, profile_path=None, report_path=None, verbose=True):
+        self.name = name
+        self.profile_path = profile_path
+        self.report_path = report_path
+        self.verbose = verbose
+        self.record = None
+        self._profiler = None
+        self._sampler = None
+
+    def __enter__(self):
+        self._first_section = len(SECTIONS)
+        self._io = _store_io()
+        self._os_io = _os_io()
+        self._cpu = time.process_time()
+        self._reaped_cpu = _reaped_children_cpu()
+        if psutil is not None:
+            self._sampler = _ProcessSampler()
+            self._sampler.start()
+        self._wall = time.perf_counter()
+        if self.profile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        if self._sampler is not None:
+            self._sampler.stop()
+            children_cpu = self._sampler.children_cpu()
+            peak_rss = round(self._sampler.peak_rss / MB, 1)
+        else:
+            children_cpu = _reaped_children_cpu() - self._reaped_cpu
+            peak_rss = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._write_profile()
+
+        ok = exc_type is None or (exc_type is SystemExit and exc.code in (0, None))
+        self.record = {
+            'name': self.name,
+            'status': 'ok' if ok else f"error: {exc_type.__name__}",
+            'wall_seconds': round(wall, 3),
+            'cpu_seconds': round(cpu, 3),
+            'children_cpu_seconds': round(children_cpu, 3),
+            # This block only, this process + workers summed; None without psutil
+            'peak_rss_mb': peak_rss,
+            # Since process start, so nested sections only ever repeat the highest value
+            'process_lifetime_peak_rss_mb': lifetime_peak_rss_mb(),
+            **{key: value - self._io[key] for key, value in _store_io().items()},
+            **{key: value - self._os_io[key] for key, value in _os_io().items() if key in self._os_io},
+        }
+        nested = SECTIONS[self._first_section:]
+        if nested:
+            self.record['sections'] = list(nested)
+            del SECTIONS[self._first_section:]
+        SECTIONS.append(self.record)
+
+        if self.verbose:
+            print(f"[{self.name}] {wall:.2f}s wall, {cpu:.2f}s CPU (+{children_cpu:.2f}s workers), "
+                  f"peak RSS {self.record['peak_rss_mb']} MB, "
+                  f"rows {self.record['rows_in']:,} in / {self.record['rows_out']:,} out")
+        if self.report_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.report_path)), exist_ok=True)
+            with open(self.report_path, 'w') as f:
+                json.dump(self.record, f, indent=2)
+        return False
+
+    def _write_profile(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.profile_path)), exist_ok=True)
+        self._profiler.dump_stats(self.profile_path)
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(25)
+        print(f"[{self.name}] profile saved to {self.profile_path}")
+        print(out.getvalue())
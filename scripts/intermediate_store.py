@@ -0,0 +1,183 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# === Intermediate dataset layer ===
+# Every stage hands its output to the next one through these helpers.
+# Paths ending in .csv keep the old CSV behaviour; anything else (e.g. .parquet)
+# is stored as typed, compressed columnar Parquet so downstream stages skip
+# re-parsing and can read only the columns they use.
+
+COMPRESSION = 'zstd'
+
+# === Compact dtype mode ===
+# Off by default; set COMPACT_DTYPES=1 (or pass compact=True) to shrink frames at
+# every load and save: low-cardinality strings -> category, years -> int16,
+# float features -> float32, integer columns -> smallest (unsigned) int.
+COMPACT_DTYPES = os.environ.get('COMPACT_DTYPES', '0') == '1'
+YEAR_COLUMNS = ('year_of_transaction', 'creation_year', 'year')
+CATEGORY_MAX_RATIO = 0.5  # convert object columns with at most this share of distinct values
+# Coordinates keep float64: float32 would cost metres of precision in the distance stages
+FLOAT64_KEYWORDS = ('lat', 'lon', 'easting', 'northing')
+
+
+def is_csv(path):
+    return str(path).lower().endswith('.csv')
+
+
+def _ensure_dir(path):
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+
+
+# === I/O counters (read by instrumentation.py) ===
+# Rows and on-disk bytes moved through the helpers below in this process.
+IO_STATS = {'rows_in': 0, 'rows_out': 0, 'bytes_read': 0, 'bytes_written': 0}
+
+
+def count_read(rows, path=None):
+    """Count rows read from a raw source outside these helpers; ``path`` adds its size."""
+    IO_STATS['rows_in'] += rows
+    if path is not None:
+        IO_STATS['bytes_read'] += os.path.getsize(path)
+
+
+def _stored_bytes(path, columns=None):
+    """Bytes a read touches: the whole file, or only the selected Parquet column chunks."""
+    if is_csv(path) or columns is None:
+        return os.path.getsize(path)
+    wanted = set(columns)
+    meta = pq.ParquetFile(path).metadata
+    total = 0
+    for i in range(meta.num_row_groups):
+        row_group = meta.row_group(i)
+        for j in range(row_group.num_columns):
+            chunk = row_group.column(j)
+            if chunk.path_in_schema.split('.')[0] in wanted:
+                total += chunk.total_compressed_size
+    return total
+
+
+def _keeps_float64(col):
+    name = str(col).lower()
+    return any(key in name for key in FLOAT64_KEYWORDS)
+
+
+def compact_frame(df, categorical=True, downcast_ints=True):
+    """Return ``df`` with compact dtypes (see ``COMPACT_DTYPES``).
+
+    ``categorical`` and ``downcast_ints`` depend on the data, so chunked
+    writers turn them off to keep one schema across chunks.
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col in YEAR_COLUMNS and pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            out[col] = s.astype('int16') if s.notna().all() else s.astype('Int16')
+        elif pd.api.types.is_float_dtype(s) and not _keeps_float64(col):
+            out[col] = s.astype(np.float32)
+        elif downcast_ints and pd.api.types.is_integer_dtype(s) and not pd.api.types.is_extension_array_dtype(s):
+            out[col] = pd.to_numeric(s, downcast='unsigned' if len(s) and s.min() >= 0 else 'integer')
+        elif categorical and s.dtype == object and len(s):
+            out[col] = s.astype('category') if s.nunique() <= CATEGORY_MAX_RATIO * len(s) else s
+        else:
+            out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+def _compact(compact):
+    return COMPACT_DTYPES if compact is None else compact
+
+
+def stage_columns(path):
+    """Column names of a stored stage without loading its data."""
+    if is_csv(path):
+        return pd.read_csv(path, nrows=0).columns.tolist()
+    return pq.read_schema(path).names
+
+
+def load_stage(path, columns=None, compact=None):
+    """Load a stage output, optionally only the given columns."""
+    if is_csv(path):
+        df = pd.read_csv(path, usecols=columns, low_memory=False)
+    else:
+        df = pd.read_parquet(path, columns=columns)
+    IO_STATS['rows_in'] += len(df)
+    IO_STATS['bytes_read'] += _stored_bytes(path, columns)
+    return compact_frame(df) if _compact(compact) else df
+
+
+def iter_stage(path, columns=None, batch_size=500_000, compact=None):
+    """Yield a stage output in DataFrame chunks of about ``batch_size`` rows."""
+    if is_csv(path):
+        chunks = pd.read_csv(path, usecols=columns, chunksize=batch_size, low_memory=False)
+    else:
+        chunks = (batch.to_pandas() for batch in
+                  pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns))
+    IO_STATS['bytes_read'] += _stored_bytes(path, columns)
+    for chunk in chunks:
+        IO_STATS['rows_in'] += len(chunk)
+        yield compact_frame(chunk, categorical=False, downcast_ints=False) if _compact(compact) else chunk
+
+
+def save_stage(df, path, export_csv=False, compact=None):
+    """Save a stage output; ``export_csv`` also writes a .csv copy next to it."""
+    _ensure_dir(path)
+    if _compact(compact):
+        df = compact_frame(df)
+    IO_STATS['rows_out'] += len(df)
+    if is_csv(path):
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False, compression=COMPRESSION)
+    IO_STATS['bytes_written'] += os.path.getsize(path)
+    if export_csv and not is_csv(path):
+        csv_path = os.path.splitext(path)[0] + '.csv'
+        df.to_csv(csv_path, index=False)
+        IO_STATS['bytes_written'] += os.path.getsize(csv_path)
+
+
+class StageWriter:
+    """Append chunks to a stage output without holding the whole table."""
+
+    def __init__(self, path, compact=None):
+        self.path = path
+        self.compact = _compact(compact)
+        self.schema = None
+        self._writer = None
+        self._csv_header = True
+        _ensure_dir(path)
+
+    def write(self, df):
+        IO_STATS['rows_out'] += len(df)
+        if self.compact:
+            df = compact_frame(df, categorical=False, downcast_ints=False)
+        if is_csv(self.path):
+            df.to_csv(self.path, mode='w' if self._csv_header else 'a',
+                      header=self._csv_header, index=False)
+            self._csv_header = False
+            return
+        if self._writer is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            # All-null columns in the first chunk would otherwise lock in a null type
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, pa.field(field.name, pa.string()))
+            self.schema = schema
+            self._writer = pq.ParquetWriter(self.path, schema, compression=COMPRESSION)
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self, empty_frame=None):
+        """Finish the file; ``empty_frame`` supplies the header if nothing was written."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            IO_STATS['bytes_written'] += os.path.getsize(self.path)
+        elif self._csv_header and empty_frame is not None:
+            save_stage(empty_frame, self.path)
+        elif not self._csv_header:
+            IO_STATS['bytes_written'] += os.path.getsize(self.path)
@@ -2,10 +2,14 @@ import pandas as pd
 import folium
 from folium.plugins import TimestampedGeoJson
 import os
+from intermediate_store import load_stage
 
 # === Load dataset ===
 file_path = "INPUT YOUR FILE PATH HERE"
-df = pd.read_csv(file_path, low_memory=False)
+df = load_stage(file_path, columns=[
+    'Latitude', 'Longitude', 'station_lat', 'station_lon', 'nearest_station_name', 'distance_to_station',
+    'real_price', 'date_of_transfer', 'railway_period', 'town/city'
+])
 
 # === Clean and standardize ===
 df = df.dropna(subset=['Latitude', 'Longitude', 'station_lat', 'station_lon', 'real_price', 'date_of_transfer'])
@@ -1,53 +1,65 @@
 import pandas as pd
-import os
-from pyproj import Transformer
+from codepoint import load_codepoint
+from postcodes import PostcodeDictionary, normalise_postcodes, gather
+from intermediate_store import load_stage, save_stage
 
 # Paths
 codepoint_folder = "INPUT YOUR FILE PATH HERE"
 property_file = "INPUT YOUR FILE PATH HERE"
 codepoint_output = "INPUT YOUR FILE PATH HERE"
 final_output = "INPUT YOUR FILE PATH HERE"
+postcode_dictionary_file = "INPUT YOUR FILE PATH HERE"  # shared postcode -> int32 id dictionary
+codepoint_cache_dir = "INPUT YOUR FILE PATH HERE"  # converted table cached per Code-Point release
+max_workers = None  # threads for reading area files (None = Python default)
 
-# Read and combine Code-Point Open CSV files
-df_list = []
+# === Step ===
+# "all":        build the Code-Point table and dictionary, then join properties.
+# "codepoint":  only build and save the Code-Point table and dictionary
+#               (independent of the price data, so it can run alongside clean_price_data.py).
+# "properties": only join properties, reusing the saved table and dictionary.
+step = "all"
+if step not in ("all", "codepoint", "properties"):
+    raise ValueError(f"Unknown step: {step!r} (expected 'all', 'codepoint' or 'properties')")
 
-for file in os.listdir(codepoint_folder):
-    if file.endswith(".csv"):
-        path = os.path.join(codepoint_folder, file)
-        df = pd.read_csv(path, header=None, encoding='latin1')  # safer encoding
-        df = df[[0, 2, 3]]  # Columns: Postcode, Easting, Northing
-        df.columns = ['Postcode', 'Easting', 'Northing']
-        df_list.append(df)
+if step == "properties":
+    codepoint = load_stage(codepoint_output, columns=['postcode_id', 'Easting', 'Northing', 'Longitude', 'Latitude'])
+    postcode_dict = PostcodeDictionary.load(postcode_dictionary_file)
+else:
+    # Read Code-Point Open and convert Easting/Northing to Latitude/Longitude
+    # (skipped entirely when this release is already cached)
+    codepoint = load_codepoint(codepoint_folder, cache_dir=codepoint_cache_dir, max_workers=max_workers)
 
-codepoint = pd.concat(df_list, ignore_index=True)
+    # Build the shared postcode dictionary from the full Code-Point set
+    codepoint['Postcode'] = normalise_postcodes(codepoint['Postcode'])
+    postcode_dict = PostcodeDictionary.build(codepoint['Postcode'])
+    postcode_dict.save(postcode_dictionary_file)
+    codepoint['postcode_id'] = postcode_dict.encode(codepoint['Postcode'], normalised=True)
+    print(f"Postcode dictionary: {len(postcode_dict):,} postcodes saved to: {postcode_dictionary_file}")
 
-# Convert Easting/Northing to Latitude/Longitude
-transformer = Transformer.from_crs("epsg:27700", "epsg:4326", always_xy=True)
-codepoint[['Longitude', 'Latitude']] = codepoint.apply(
-    lambda row: pd.Series(transformer.transform(row['Easting'], row['Northing'])),
-    axis=1
-)
+    # Save full Code-Point data with lat/lon
+    save_stage(codepoint, codepoint_output)
+    print(f"Saved full codepoint with lat/lon to: {codepoint_output}")
 
-# Save full Code-Point data with lat/lon
-codepoint.to_csv(codepoint_output, index=False)
-print(f"Saved full codepoint with lat/lon to: {codepoint_output}")
+if step == "codepoint":
+    raise SystemExit(0)
 
 # Load enriched property dataset
-properties = pd.read_csv(property_file)
+properties = load_stage(property_file)
 
-# Clean and standardise postcodes
-properties['postcode'] = properties['postcode'].astype(str).str.strip().str.replace(" ", "").str.upper()
-codepoint['Postcode'] = codepoint['Postcode'].astype(str).str.strip().str.replace(" ", "").str.upper()
+# Clean and standardise postcodes, then encode to int32 ids
+properties['postcode'] = normalise_postcodes(properties['postcode'])
+properties['postcode_id'] = postcode_dict.encode(properties['postcode'], normalised=True)
 
 # Drop rows with missing postcodes
-properties = properties[properties['postcode'].notna()]
+properties = properties[properties['postcode'].notna()].reset_index(drop=True)
 
-# Merge lat/lon into property dataset
-merged = pd.merge(properties, codepoint, left_on='postcode', right_on='Postcode', how='left')
-merged = merged.drop(columns=['Postcode'])
+# Join lat/lon into property dataset on postcode_id
+pos = postcode_dict.positions(properties['postcode_id'], codepoint['postcode_id'])
+coords = gather(codepoint, ['Easting', 'Northing', 'Longitude', 'Latitude'], pos)
+merged = pd.concat([properties, coords], axis=1)
 
 # Save the merged dataset
-merged.to_csv(final_output, index=False)
+save_stage(merged, final_output)
 print(f"Final property dataset with lat/lon saved to: {final_output}")
 
 # Extra: Summary
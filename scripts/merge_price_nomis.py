@@ -1,30 +1,20 @@
 import pandas as pd
-import os
+import numpy as np
+from intermediate_store import load_stage, save_stage, count_read
 
 # === File paths ===
 property_file = "INPUT YOUR FILE PATH HERE"
 business_file = "INPUT YOUR FILE PATH HERE"
 output_file = "INPUT YOUR FILE PATH HERE"
 
-# === Load datasets ===
-properties = pd.read_csv(property_file)
-business = pd.read_csv(business_file)
-
-# === Convert date and extract year ===
-properties['date_of_transfer'] = pd.to_datetime(properties['date_of_transfer'], errors='coerce')
-properties['year_of_transaction'] = properties['date_of_transfer'].dt.year
-
-# === Melt business dataset: wide → long format ===
-business = business.melt(id_vars=business.columns[0], var_name='year', value_name='business_count')
-business = business.rename(columns={business.columns[0]: 'district'})
-business['year'] = business['year'].astype(int)
-
-# === Clean and standardize district text ===
-properties['district'] = properties['district'].astype(str).str.strip().str.upper()
-business['district'] = business['district'].astype(str).str.strip().str.upper()
+# Value used for rows without a business count. None leaves them missing (NaN),
+# so Outliner_cleaned.py and Feature Engineering.py drop them instead of
+# treating "no Nomis match" as zero businesses; set 0 for the old fill.
+# Either way such rows are flagged in business_count_status.
+fill_missing_business_count = None
 
 # === Boundary & correction mapping (to match Nomis districts) ===
-properties['district'] = properties['district'].replace({
+district_crosswalk = {
     'CORBY': 'NORTH NORTHAMPTONSHIRE',
     'KETTERING': 'NORTH NORTHAMPTONSHIRE',
     'EAST NORTHAMPTONSHIRE': 'NORTH NORTHAMPTONSHIRE',
@@ -46,24 +36,65 @@ properties['district'] = properties['district'].replace({
 
     'DAVENTRY': 'NORTH NORTHAMPTONSHIRE',
     'WELLINGBOROUGH': 'NORTH NORTHAMPTONSHIRE'
-})
-
-# === Merge datasets on ['district', 'year'] ===
-final = properties.merge(
-    business,
-    left_on=['district', 'year_of_transaction'],
-    right_on=['district', 'year'],
-    how='left'
-)
+}
+
+# === Load datasets ===
+properties = load_stage(property_file)
+business = pd.read_csv(business_file)
+count_read(len(business), business_file)
 
-# === Fill missing business_count with 0 ===
-final['business_count'] = final['business_count'].fillna(0)
+# === Convert date and extract year ===
+properties['date_of_transfer'] = pd.to_datetime(properties['date_of_transfer'], errors='coerce')
+properties['year_of_transaction'] = properties['date_of_transfer'].dt.year
 
-# === Drop duplicate column
-final = final.drop(columns=['year'])
+# === Melt business dataset: wide → long format ===
+business = business.melt(id_vars=business.columns[0], var_name='year', value_name='business_count')
+business = business.rename(columns={business.columns[0]: 'district'})
+business['year'] = business['year'].astype(int)
+business['business_count'] = pd.to_numeric(
+    business['business_count'].astype(str).str.replace(',', ''), errors='coerce')
+
+# === Dense (district_code, year) business-count table ===
+# Districts become categorical codes; counts sit in a 2-D array indexed by (code, year - first_year)
+district_codes, districts = pd.factorize(business['district'].astype(str).str.strip().str.upper())
+first_year = business['year'].min()
+counts = np.full((len(districts), business['year'].max() - first_year + 1), np.nan)
+counts[district_codes, business['year'].to_numpy() - first_year] = business['business_count'].to_numpy()
+
+# === Compile property districts to codes once per distinct district ===
+# Clean and standardize district text, then apply the crosswalk (single pass, as before)
+prop_codes, prop_districts = pd.factorize(properties['district'].astype(str))
+clean_districts = pd.Index(prop_districts).str.strip().str.upper()
+mapped_districts = clean_districts.map(lambda d: district_crosswalk.get(d, d))
+properties['district'] = np.asarray(mapped_districts, dtype=object)[prop_codes]
+row_district = pd.Index(districts).get_indexer(mapped_districts)[prop_codes]
+
+# === Vectorized gather of business_count by (district_code, year) ===
+year_offset = properties['year_of_transaction'].to_numpy(dtype=float) - first_year
+district_ok = row_district >= 0
+year_ok = ~np.isnan(year_offset) & (year_offset >= 0) & (year_offset < counts.shape[1])
+valid = district_ok & year_ok
+business_count = np.full(len(properties), np.nan)
+business_count[valid] = counts[row_district[valid], year_offset[valid].astype(np.int64)]
+properties['business_count'] = business_count
+
+# === Flag rows without a business count instead of filling with 0 ===
+properties['business_count_status'] = np.select(
+    [~district_ok, ~year_ok, np.isnan(business_count)],
+    ['unmatched_district', 'year_out_of_range', 'missing_count'],
+    default='matched'
+)
+if fill_missing_business_count is not None:
+    properties['business_count'] = properties['business_count'].fillna(fill_missing_business_count)
+final = properties
 
 # === Save final merged dataset
-os.makedirs(os.path.dirname(output_file), exist_ok=True)
-final.to_csv(output_file, index=False)
+save_stage(final, output_file)
 
 print("complete: final_enriched_dataset.csv saved")
+print("\nBusiness count match status:")
+print(final['business_count_status'].value_counts())
+unmatched = final.loc[~district_ok, 'district'].value_counts()
+if not unmatched.empty:
+    print("\nDistricts not found in Nomis (add them to district_crosswalk):")
+    print(unmatched)
@@ -0,0 +1,55 @@
+import pandas as pd
+from intermediate_store import load_stage, save_stage
+from price_paid import read_price_paid, clean_chunk, apply_record_status
+
+# === Paths ===
+monthly_file = "INPUT YOUR FILE PATH HERE"    # Land Registry monthly change file (pp-monthly-update.csv)
+cleaned_store = "INPUT YOUR FILE PATH HERE"   # output of clean_price_data.py, updated in place
+delta_output = "INPUT YOUR FILE PATH HERE"    # this month's cleaned A/C rows
+enriched_delta = "INPUT YOUR FILE PATH HERE"  # a row-level stage's output for the delta rows
+enriched_store = "INPUT YOUR FILE PATH HERE"  # the same stage's full output, updated in place
+
+# === Step ===
+# "prepare": upsert/delete into the cleaned store and write the delta rows.
+# "apply":   fold one stage's delta output back into that stage's full output.
+# Run through `python pipeline.py monthly --config pipeline.json`: it runs
+# "prepare", the row-level stages (merge_codepoint_latlon -> station info ->
+# real_price -> merge_price_nomis) on the delta only, "apply" for each of their
+# outputs, and records the updated outputs so the next `pipeline.py run` keeps
+# them and reruns only Outliner_cleaned.py onward. Updating the stores by hand
+# instead leaves the runner to rebuild them from the raw file.
+step = "prepare"
+
+# === Load change file (record_status: A = added, C = changed, D = deleted) ===
+changes = pd.concat(read_price_paid(monthly_file), ignore_index=True)
+changes['record_status'] = changes['record_status'].str.strip().str.upper()
+print("Change records by status:")
+print(changes['record_status'].value_counts())
+
+if step == "prepare":
+    existing = load_stage(cleaned_store)
+    cleaned_changes = clean_chunk(changes.copy())
+    delta = cleaned_changes[cleaned_changes['record_status'].isin(['A', 'C'])]
+
+    # The distance, CPI and business-count stages are row-level (each row depends
+    # only on its own postcode and year), so the delta rows are all they recompute;
+    # deleted rows simply leave the stores.
+    updated = apply_record_status(existing, changes, upserts=delta)
+    save_stage(updated, cleaned_store)
+    save_stage(delta, delta_output)
+
+    removed = len(existing) + len(delta) - len(updated)
+    print(f"Cleaned store: {len(existing):,} -> {len(updated):,} rows "
+          f"({removed:,} replaced/removed, {len(delta):,} added/changed)")
+    print(f"Delta rows saved to: {delta_output}")
+
+elif step == "apply":
+    existing = load_stage(enriched_store)
+    delta = load_stage(enriched_delta)
+    updated = apply_record_status(existing, changes, upserts=delta)
+    save_stage(updated, enriched_store)
+
+    print(f"Enriched store: {len(existing):,} -> {len(updated):,} rows")
+
+else:
+    raise ValueError(f"Unknown step: {step!r} (expected 'prepare' or 'apply')")
@@ -0,0 +1,610 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+from instrumentation import measure
+
+# === Pipeline runner ===
+# Declares the stage DAG (script, input and output path variables) and runs the
+# stand-alone scripts with their placeholder paths filled in from a JSON config.
+# Each stage is keyed by a hash of its code (script + local helper modules), its
+# parameters and the content of its inputs; a stage whose key and outputs are
+# unchanged since its last run is skipped.
+#
+#   python pipeline.py run --config pipeline.json            # whole pipeline
+#   python pipeline.py run --config pipeline.json real_price  # a stage and its upstream
+#   python pipeline.py status --config pipeline.json
+#   python pipeline.py monthly --config pipeline.json          # fold in paths.price_paid_monthly
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PLACEHOLDER = "INPUT YOUR FILE PATH HERE"
+# Environment settings that change what a stage writes
+KEYED_ENV = ('COMPACT_DTYPES',)
+
+
+class Stage:
+    """A script plus the module variables that name its input and output paths.
+
+    ``inputs`` and ``outputs`` map a script variable to a key of the config's
+    ``paths`` section; an output key used as another stage's input is the edge.
+    ``params`` are fixed settings for this stage (config ``params`` apply on top,
+    looked up under ``config_name``, which defaults to ``name``).
+    """
+
+    def __init__(self, name, script, inputs, outputs, params=None, config_name=None):
+        self.name = name
+        self.script = script
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+        self.config_name = config_name or name
+
+
+STAGES = [
+    Stage('clean_price_data', 'clean_price_data.py',
+          inputs={'input_path': 'price_paid_raw'},
+          outputs={'output_path': 'price_clean'}),
+    Stage('clean_naptan_data', 'clean_naptan_data.py',
+          inputs={'naptan_file': 'naptan_raw'},
+          outputs={'output_path': 'stations', 'history_output_path': 'station_history',
+                   'bus_stop_output_path': 'bus_stops'}),
+    Stage('codepoint', 'merge_codepoint_latlon.py',
+          inputs={'codepoint_folder': 'codepoint_folder'},
+          outputs={'codepoint_output': 'codepoint_table', 'postcode_dictionary_file': 'postcode_dictionary'},
+          params={'step': 'codepoint'}),
+    Stage('merge_codepoint_latlon', 'merge_codepoint_latlon.py',
+          inputs={'property_file': 'price_clean', 'codepoint_output': 'codepoint_table',
+                  'postcode_dictionary_file': 'postcode_dictionary'},
+          outputs={'final_output': 'price_latlon'},
+          params={'step': 'properties'}),
+    Stage('postcode_with_nearest_station', 'postcode_with_nearest_station.py',
+          inputs={'postcode_file': 'codepoint_table', 'station_file': 'stations'},
+          outputs={'output_file': 'postcode_station', 'station_index_file': 'station_index'}),
+    Stage('spatial_features', 'spatial_features.py',
+          inputs={'postcode_file': 'codepoint_table', 'station_file': 'stations', 'bus_stop_file': 'bus_stops'},
+          outputs={'output_file': 'spatial_features', 'station_index_file': 'spatial_station_index',
+                   'bus_stop_index_file': 'bus_stop_index'}),
+    Stage('real_price_with_station_info', 'real_price_with_station_info.py',
+          inputs={'property_file': 'price_latlon', 'nearest_station_file': 'postcode_station',
+                  'postcode_dictionary_file': 'postcode_dictionary'},
+          outputs={'output_file': 'price_station'}),
+    Stage('real_price', 'real_price.py',
+          inputs={'property_file': 'price_station', 'inflation_file': 'cpi'},
+          outputs={'output_file': 'price_real'}),
+    Stage('merge_price_nomis', 'merge_price_nomis.py',
+          inputs={'property_file': 'price_real', 'business_file': 'nomis_business'},
+          outputs={'output_file': 'price_business'}),
+    Stage('outliers', 'Outliner_cleaned.py',
+          inputs={'input_path': 'price_business'},
+          outputs={'output_path': 'price_outliers'}),
+    Stage('feature_engineering', 'Feature Engineering.py',
+          inputs={'input_path': 'price_outliers', 'spatial_features_file': 'spatial_features'},
+          outputs={'output_path': 'model_table'}),
+    Stage('cross_validation', 'Cross-Validation 4 Model.py',
+          inputs={'input_path': 'model_table'},
+          outputs={'output_path': 'cv_results', 'oof_output_path': 'cv_oof_predictions'}),
+    Stage('regression_models', 'Regression Modeling Code (Baseline + Tree Model+Xgboost+LGBM.py',
+          inputs={'file_path': 'model_table'},
+          outputs={'output_folder': 'regression_output'}),
+    Stage('cross_town_validation', 'Cross-town Validation for All Models.py',
+          inputs={'file_path': 'model_table'},
+          outputs={'output_dir': 'cross_town_output'}),
+]
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+# === Monthly update stages (pipeline.py monthly) ===
+# monthly_update.py upserts the change file into price_clean and writes the A/C
+# rows to a delta file; the row-level stages up to merge_price_nomis run on that
+# delta alone, and each delta is folded into the matching full output. The
+# updated outputs are then recorded as those stages' manifests, so the next
+# `run` keeps them and only reruns outliers onward.
+MONTHLY_ROW_STAGES = ['merge_codepoint_latlon', 'real_price_with_station_info', 'real_price', 'merge_price_nomis']
+MONTHLY_STORES = ['price_clean', 'price_latlon', 'price_station', 'price_real', 'price_business']
+
+
+def _delta_key(key):
+    """Path key of the monthly delta of a stored output (kept under cache_dir)."""
+    return f"monthly_{key}" if key in MONTHLY_STORES else key
+
+
+MONTHLY_STAGES = [
+    Stage('monthly_prepare', 'monthly_update.py',
+          inputs={'monthly_file': 'price_paid_monthly'},
+          outputs={'cleaned_store': 'price_clean', 'delta_output': _delta_key('price_clean')},
+          params={'step': 'prepare'}),
+]
+for _name in MONTHLY_ROW_STAGES:
+    _stage = STAGES_BY_NAME[_name]
+    MONTHLY_STAGES.append(Stage(
+        f"monthly_{_name}", _stage.script,
+        inputs={var: _delta_key(key) for var, key in _stage.inputs.items()},
+        outputs={var: _delta_key(key) for var, key in _stage.outputs.items()},
+        params=_stage.params, config_name=_name))
+for _key in MONTHLY_STORES[1:]:
+    MONTHLY_STAGES.append(Stage(
+        f"monthly_apply_{_key}", 'monthly_update.py',
+        inputs={'monthly_file': 'price_paid_monthly', 'enriched_delta': _delta_key(_key)},
+        outputs={'enriched_store': _key},
+        params={'step': 'apply'}))
+MONTHLY_BY_NAME = {stage.name: stage for stage in MONTHLY_STAGES}
+
+
+# === Config ===
+def load_config(path):
+    """Read the JSON config and make its paths absolute (relative to the config file)."""
+    with open(path) as f:
+        config = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    config['paths'] = {key: os.path.abspath(os.path.join(base, value))
+                       for key, value in config.get('paths', {}).items() if value != PLACEHOLDER}
+    config.setdefault('params', {})
+    config['cache_dir'] = os.path.abspath(os.path.join(base, config.get('cache_dir', '.pipeline_cache')))
+    for key in MONTHLY_STORES:
+        config['paths'].setdefault(_delta_key(key), os.path.join(config['cache_dir'], 'monthly', f"{key}.parquet"))
+    return config
+
+
+def stage_overrides(stage, config):
+    """Script variable -> value: configured paths plus the stage's ``params``."""
+    overrides = {}
+    for var, key in {**stage.inputs, **stage.outputs}.items():
+        if key not in config['paths']:
+            raise KeyError(f"{stage.name}: paths.{key} is not set in the config (needed for {var})")
+        overrides[var] = config['paths'][key]
+    overrides.update(stage_params(stage, config))
+    return overrides
+
+
+def stage_params(stage, config):
+    return {**stage.params, **config['params'].get(stage.config_name, {})}
+
+
+# === DAG ===
+def upstream(stage):
+    """Stages whose outputs ``stage`` reads."""
+    needed = set(stage.inputs.values())
+    return [s for s in STAGES if s is not stage and needed & set(s.outputs.values())]
+
+
+def select_stages(targets=None):
+    """``targets`` and everything upstream of them, in pipeline order."""
+    if not targets:
+        return list(STAGES)
+    unknown = [name for name in targets if name not in STAGES_BY_NAME]
+    if unknown:
+        raise KeyError(f"Unknown stage(s): {unknown} (expected some of {list(STAGES_BY_NAME)})")
+    selected = set()
+    pending = [STAGES_BY_NAME[name] for name in targets]
+    while pending:
+        stage = pending.pop()
+        if stage.name not in selected:
+            selected.add(stage.name)
+            pending.extend(upstream(stage))
+    return [stage for stage in STAGES if stage.name in selected]
+
+
+# === Hashing ===
+class DigestCache:
+    """Content digests of files and folders, reused while size and mtime are unchanged."""
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(cache_dir, 'file_digests.json')
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.entries, f, indent=1)
+
+    def file(self, path):
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        entry = self.entries.get(path)
+        if entry and entry[:2] == stamp:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.entries[path] = stamp + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def path_digest(self, path):
+        """Digest of a file, or of every file under a folder; None if missing."""
+        if os.path.isfile(path):
+            return self.file(path)
+        if not os.path.isdir(path):
+            return None
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                digest.update(os.path.relpath(full, path).encode())
+                digest.update(self.file(full).encode())
+        return digest.hexdigest()
+
+
+def _local_imports(path):
+    """Paths of helper modules in the scripts folder imported by ``path``."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    found = []
+    for name in sorted(names):
+        module = os.path.join(SCRIPTS_DIR, f"{name}.py")
+        if os.path.exists(module):
+            found.append(module)
+    return found
+
+
+def code_digest(script):
+    """Hash of a script and, recursively, the local modules it imports (plus data files they read)."""
+    digest = hashlib.sha256()
+    seen = set()
+    pending = [os.path.join(SCRIPTS_DIR, script)]
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        pending.extend(_local_imports(path))
+    for path in sorted(seen):
+        with open(path, 'rb') as f:
+            digest.update(os.path.basename(path).encode())
+            digest.update(f.read())
+    # price_paid.py reads the station-opening table next to it
+    openings = os.path.join(SCRIPTS_DIR, 'station_openings.csv')
+    if os.path.join(SCRIPTS_DIR, 'price_paid.py') in seen:
+        with open(openings, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def stage_key(stage, config, digests):
+    """Content address of a stage run: code, parameters and input contents."""
+    inputs = {}
+    for var, key in stage.inputs.items():
+        path = config['paths'][key]
+        inputs[var] = digests.path_digest(path)
+        if inputs[var] is None:
+            raise FileNotFoundError(f"{stage.name}: input {var} = {path} does not exist")
+    payload = {
+        'script': stage.script,
+        'code': code_digest(stage.script),
+        'params': stage_params(stage, config),
+        'outputs': {var: config['paths'][key] for var, key in stage.outputs.items()},
+        'inputs': inputs,
+        'env': {name: os.environ.get(name) for name in KEYED_ENV},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# === Stage manifests ===
+def _manifest_path(config, stage):
+    return os.path.join(config['cache_dir'], 'stages', f"{stage.name}.json")
+
+
+def read_manifest(config, stage):
+    path = _manifest_path(config, stage)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(config, stage, manifest):
+    path = _manifest_path(config, stage)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def record_outputs(config, stage, key, digests, **info):
+    """Write the manifest marking ``stage``'s current outputs as the result of ``key``."""
+    outputs = {config['paths'][name]: digests.path_digest(config['paths'][name])
+               for name in stage.outputs.values()}
+    write_manifest(config, stage, {
+        'key': key, 'script': stage.script, 'outputs': outputs,
+        'finished_at': time.strftime('%Y-%m-%d %H:%M:%S'), **info,
+    })
+
+
+def is_cached(stage, config, digests, key):
+    """True if the last run had this key and its outputs are still on disk unchanged."""
+    manifest = read_manifest(config, stage)
+    if manifest is None or manifest['key'] != key:
+        return False
+    return all(digests.path_digest(path) == digest for path, digest in manifest['outputs'].items())
+
+
+# === Running one script ===
+def run_script(script, overrides):
+    """Execute a script with top-level assignments to ``overrides`` replaced by their values."""
+    path = os.path.join(SCRIPTS_DIR, script)
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    missing = set(overrides)
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and node.targets[0].id in overrides):
+            name = node.targets[0].id
+            node.value = ast.copy_location(ast.parse(repr(overrides[name]), mode='eval').body, node.value)
+            missing.discard(name)
+    if missing:
+        raise KeyError(f"{script}: no top-level assignment to {sorted(missing)}")
+    ast.fix_missing_locations(tree)
+
+    sys.path.insert(0, SCRIPTS_DIR)
+    sys.argv = [path]
+    exec(compile(tree, path, 'exec'), {'__name__': '__main__', '__file__': path})
+
+
+def _report_dir(config):
+    return os.path.join(config['cache_dir'], 'reports')
+
+
+def exec_stage(stage, config_path, profile=False):
+    """Run one stage in this process under ``measure``, writing its stage report."""
+    config = load_config(config_path)
+    reports = _report_dir(config)
+    with measure(stage.name,
+                 profile_path=os.path.join(reports, f"{stage.name}.prof") if profile else None,
+                 report_path=os.path.join(reports, 'stages', f"{stage.name}.json")):
+        run_script(stage.script, stage_overrides(stage, config))
+
+
+def run_stage_process(stage, config_path, log_path=None, profile=False):
+    """Start one stage in a fresh interpreter; output goes to ``log_path`` if given."""
+    cmd = [sys.executable, os.path.abspath(__file__), 'exec', stage.name, '--config', config_path]
+    if profile:
+        cmd.append('--profile')
+    if log_path is None:
+        return subprocess.Popen(cmd, cwd=SCRIPTS_DIR)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'w') as log:
+        return subprocess.Popen(cmd, cwd=SCRIPTS_DIR, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stage_memory(stage, config):
+    """Memory a stage is expected to need (GB), from the config's ``memory_gb``."""
+    return float(config.get('memory_gb', {}).get(stage.name, config.get('default_memory_gb', 1)))
+
+
+# === Commands ===
+def dry_run(config, stages, force, digests):
+    would_run = set()
+    for stage in stages:
+        stage_overrides(stage, config)  # fail early on unset paths
+        if any(s.name in would_run for s in upstream(stage)):
+            # Inputs will be rewritten first, so the current key says nothing
+            would_run.add(stage.name)
+            print(f"  [would run] {stage.name} (upstream changed)")
+            continue
+        key = stage_key(stage, config, digests)
+        if stage.name not in force and is_cached(stage, config, digests, key):
+            print(f"  [cached] {stage.name}")
+        else:
+            would_run.add(stage.name)
+            print(f"  [would run] {stage.name}")
+
+
+def read_stage_report(config, stage):
+    path = os.path.join(_report_dir(config), 'stages', f"{stage.name}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def run(config_path, targets=None, force=(), dry=False, max_workers=None, memory_budget_gb=None, profile=()):
+    """Run the selected stages, starting each as soon as its upstream stages finish.
+
+    Up to ``max_workers`` stages run at once, as long as their ``memory_gb``
+    estimates fit in ``memory_budget_gb`` (a stage alone may exceed it).
+    Stages in ``profile`` also save a cProfile. Every run writes a JSON report
+    with each stage's time, peak RSS and I/O to ``<cache_dir>/reports``.
+    """
+    config = load_config(config_path)
+    digests = DigestCache(config['cache_dir'])
+    stages = select_stages(targets)
+    max_workers = max_workers or config.get('max_workers', 1)
+    memory_budget_gb = memory_budget_gb or config.get('memory_budget_gb')
+    print(f"Pipeline: {len(stages)} stage(s), up to {max_workers} at once"
+          f"{f' within {memory_budget_gb} GB' if memory_budget_gb else ''}, cache in {config['cache_dir']}")
+    for stage in stages:
+        stage_overrides(stage, config)  # fail early on unset paths
+    if dry:
+        try:
+            dry_run(config, stages, force, digests)
+        finally:
+            digests.save()
+        return
+
+    pending = list(stages)
+    done = set()
+    running = {}  # stage name -> (stage, process, key, start time)
+    failed = []
+    stage_seconds = {}
+    report = {'started_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'max_workers': max_workers,
+              'memory_budget_gb': memory_budget_gb, 'stages': []}
+    pipeline_start = time.time()
+    try:
+        while pending or running:
+            # Start every ready stage that fits in the worker and memory budgets
+            progressed = False
+            for stage in list(pending):
+                if failed or len(running) >= max_workers:
+                    break
+                if any(s.name not in done for s in upstream(stage)):
+                    continue
+                key = stage_key(stage, config, digests)
+                if stage.name not in force and is_cached(stage, config, digests, key):
+                    print(f"  [cached] {stage.name}")
+                    report['stages'].append({'name': stage.name, 'status': 'cached'})
+                    pending.remove(stage)
+                    done.add(stage.name)
+                    progressed = True
+                    continue
+                in_use = sum(stage_memory(s, config) for s, *_ in running.values())
+                if running and memory_budget_gb and in_use + stage_memory(stage, config) > memory_budget_gb:
+                    continue
+                log_path = os.path.join(config['cache_dir'], 'logs', f"{stage.name}.log") if max_workers > 1 else None
+                print(f"  [run] {stage.name} ({stage.script})"
+                      f"{f' -> log {log_path}' if log_path else ''}", flush=True)
+                stage_report = os.path.join(_report_dir(config), 'stages', f"{stage.name}.json")
+                if os.path.exists(stage_report):
+                    os.remove(stage_report)
+                process = run_stage_process(stage, config_path, log_path, profile=stage.name in profile)
+                running[stage.name] = (stage, process, key, time.time())
+                pending.remove(stage)
+
+            if not running:
+                if pending and not failed and progressed:
+                    continue  # cached stages just unblocked others
+                if pending and not failed:
+                    raise RuntimeError(f"Stages can never start: {[s.name for s in pending]}")
+                break
+
+            time.sleep(0.2)
+            for name, (stage, process, key, start) in list(running.items()):
+                code = process.poll()
+                if code is None:
+                    continue
+                del running[name]
+                stage_seconds[name] = time.time() - start
+                report['stages'].append({'name': name, **read_stage_report(config, stage),
+                                         'status': 'ran' if code == 0 else f"failed (exit code {code})",
+                                         'process_seconds': round(stage_seconds[name], 3)})
+                if code != 0:
+                    failed.append(name)
+                    print(f"  [failed] {name} (exit code {code}); waiting for running stages")
+                    continue
+                record_outputs(config, stage, key, digests, seconds=round(stage_seconds[name], 2))
+                done.add(name)
+                print(f"  [done] {name} in {stage_seconds[name]:.1f}s")
+    finally:
+        digests.save()
+        report['wall_seconds'] = round(time.time() - pipeline_start, 3)
+        report['stage_seconds'] = round(sum(stage_seconds.values()), 3)
+        report_path = os.path.join(_report_dir(config), f"run-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Run report: {report_path}")
+
+    if failed:
+        raise SystemExit(f"Stage(s) failed: {failed}")
+    if stage_seconds:
+        print(f"Wall time {time.time() - pipeline_start:.1f}s for {sum(stage_seconds.values()):.1f}s of stage time")
+
+
+def status(config_path, targets=None):
+    config = load_config(config_path)
+    digests = DigestCache(config['cache_dir'])
+    stale = set()
+    for stage in select_stages(targets):
+        if any(s.name in stale for s in upstream(stage)):
+            state = 'stale (upstream)'
+        else:
+            try:
+                key = stage_key(stage, config, digests)
+                state = 'cached' if is_cached(stage, config, digests, key) else 'stale'
+            except (KeyError, FileNotFoundError) as exc:
+                state = f"blocked: {exc}"
+        if state != 'cached':
+            stale.add(stage.name)
+        print(f"{stage.name:<32} {state}")
+    digests.save()
+
+
+def monthly(config_path):
+    """Apply ``paths.price_paid_monthly`` to the stored outputs up to merge_price_nomis.
+
+    Those stages must be cached first (run the pipeline up to merge_price_nomis),
+    otherwise the update would be applied to outputs the next run replaces.
+    """
+    config = load_config(config_path)
+    digests = DigestCache(config['cache_dir'])
+    updated = select_stages(['merge_price_nomis'])
+    for stage in MONTHLY_STAGES:
+        stage_overrides(stage, config)  # fail early on unset paths
+    try:
+        stale = [stage.name for stage in updated
+                 if not is_cached(stage, config, digests, stage_key(stage, config, digests))]
+        if stale:
+            raise SystemExit(f"Not cached: {stale}. Run `pipeline.py run merge_price_nomis` first, "
+                             "then apply the monthly file.")
+
+        for stage in MONTHLY_STAGES:
+            print(f"  [run] {stage.name} ({stage.script})", flush=True)
+            code = run_stage_process(stage, config_path).wait()
+            if code != 0:
+                # Stores changed so far no longer match their manifests: the
+                # next `run` rebuilds them from the raw file
+                raise SystemExit(f"Monthly stage {stage.name} failed (exit code {code})")
+
+        # Record the updated stores as current, keyed on their new inputs
+        for stage in updated:
+            if set(stage.outputs.values()) & set(MONTHLY_STORES):
+                record_outputs(config, stage, stage_key(stage, config, digests), digests,
+                               monthly_update=config['paths']['price_paid_monthly'])
+                print(f"  [recorded] {stage.name}")
+    finally:
+        digests.save()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the railway property-value pipeline.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help="run stages whose inputs, code or parameters changed")
+    run_parser.add_argument('stages', nargs='*', help="target stages (default: all); upstream stages are included")
+    run_parser.add_argument('--config', required=True)
+    run_parser.add_argument('--force', nargs='*', default=[], help="stages to rerun even if cached")
+    run_parser.add_argument('--dry-run', action='store_true', help="only list the stages that would run")
+    run_parser.add_argument('--jobs', type=int, help="stages to run at once (default: config max_workers, else 1)")
+    run_parser.add_argument('--memory-gb', type=float, help="memory budget for concurrent stages (default: config memory_budget_gb)")
+    run_parser.add_argument('--profile', nargs='*', default=[], help="stages to run under cProfile")
+
+    status_parser = sub.add_parser('status', help="show which stages are cached or stale")
+    status_parser.add_argument('stages', nargs='*')
+    status_parser.add_argument('--config', required=True)
+
+    monthly_parser = sub.add_parser('monthly', help="apply paths.price_paid_monthly to the stored outputs")
+    monthly_parser.add_argument('--config', required=True)
+
+    exec_parser = sub.add_parser('exec', help=argparse.SUPPRESS)
+    exec_parser.add_argument('stage')
+    exec_parser.add_argument('--config', required=True)
+    exec_parser.add_argument('--profile', action='store_true')
+
+    args = parser.parse_args(argv)
+    # Stages run with cwd=SCRIPTS_DIR, so hand them the config by absolute path
+    args.config = os.path.abspath(args.config)
+    if args.command == 'run':
+        run(args.config, args.stages, force=set(args.force), dry=args.dry_run,
+            max_workers=args.jobs, memory_budget_gb=args.memory_gb, profile=set(args.profile))
+    elif args.command == 'status':
+        status(args.config, args.stages)
+    elif args.command == 'monthly':
+        monthly(args.config)
+    else:
+        exec_stage({**STAGES_BY_NAME, **MONTHLY_BY_NAME}[args.stage], args.config, profile=args.profile)
+
+
+if __name__ == '__main__':
+    main()
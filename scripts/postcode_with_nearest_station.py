@@ -1,42 +1,66 @@
-import pandas as pd
 import numpy as np
-from sklearn.neighbors import BallTree
+from intermediate_store import load_stage, StageWriter
+from distance_kernels import pairwise_distance
+from station_index import StationIndex, BNGStationIndex, load_or_build_index, query_in_blocks
 
 # === File Paths ===
 postcode_file = "INPUT YOUR FILE PATH HERE"
 station_file = "INPUT YOUR FILE PATH HERE"
+station_index_file = "INPUT YOUR FILE PATH HERE"  # persisted index, rebuilt when station_file changes
 output_file = "INPUT YOUR FILE PATH HERE"
 
+# === Chunked query settings ===
+block_size = 100_000  # postcodes per block; caps memory per worker
+n_jobs = -1           # worker processes (-1 = all cores)
+
+# === Distance mode ===
+# "haversine": BallTree on lat/lon (great-circle distance)
+# "bng":       KD-tree on Code-Point Easting/Northing, stations projected to BNG once
+distance_mode = "haversine"
+index_class = {'haversine': StationIndex, 'bng': BNGStationIndex}[distance_mode]
+# Reported distance: None keeps the tree's own distance, or recompute for the
+# matched station with "haversine", "vincenty" (ellipsoidal) or "bng"
+distance_method = None
+
 # === Load Data ===
-df_post = pd.read_csv(postcode_file)
-df_station = pd.read_csv(station_file)
+df_post = load_stage(postcode_file, columns=['Postcode', 'Easting', 'Northing', 'Longitude', 'Latitude', 'postcode_id'])
 
 # === Rename Columns for Uniformity ===
 df_post = df_post.rename(columns={'Postcode': 'postcode', 'Latitude': 'prop_lat', 'Longitude': 'prop_lon'})
-df_station = df_station.rename(columns={'CommonName': 'station_name', 'Latitude': 'station_lat', 'Longitude': 'station_lon'})
 
 # === Drop missing coordinates ===
-df_post = df_post.dropna(subset=['prop_lat', 'prop_lon'])
-df_station = df_station.dropna(subset=['station_lat', 'station_lon', 'creation_year'])
-
-# === Create coordinate tuples and convert to radians ===
-df_post['coords'] = list(zip(df_post['prop_lat'], df_post['prop_lon']))
-df_station['coords'] = list(zip(df_station['station_lat'], df_station['station_lon']))
-post_radians = np.radians(df_post['coords'].tolist())
-station_radians = np.radians(df_station['coords'].tolist())
-
-# === Find nearest station using BallTree ===
-tree = BallTree(station_radians, metric='haversine')
-distances, indices = tree.query(post_radians, k=1)
-df_post['distance_to_station_km'] = distances.flatten() * 6371  # Convert radians to km
-
-# === Add station info to postcodes ===
-nearest_stations = df_station.iloc[indices.flatten()].reset_index(drop=True)
-df_post['nearest_station_name'] = nearest_stations['station_name']
-df_post['station_lat'] = nearest_stations['station_lat']
-df_post['station_lon'] = nearest_stations['station_lon']
-df_post['station_creation_year'] = nearest_stations['creation_year']
-
-# === Save to CSV ===
-df_post.to_csv(output_file, index=False)
-print(f"Output saved to: {output_file}")
+query_cols = ['prop_lat', 'prop_lon'] if distance_mode == 'haversine' else ['Easting', 'Northing']
+df_post = df_post.dropna(subset=query_cols).reset_index(drop=True)
+
+# === Load (or build once) the station tree for this mode ===
+def build_station_index():
+    df_station = load_stage(station_file)
+    df_station = df_station.dropna(subset=['Latitude', 'Longitude', 'creation_year'])
+    return index_class.from_frame(df_station)
+
+station_index = load_or_build_index(station_index_file, station_file, build_station_index, kind=index_class)
+
+# === Find nearest station block by block across worker processes, streaming to disk ===
+writer = StageWriter(output_file)
+for start, (distances_km, indices) in query_in_blocks(
+        station_index_file, df_post[query_cols[0]], df_post[query_cols[1]],
+        block_size=block_size, n_jobs=n_jobs):
+    indices = indices[:, 0]
+    block = df_post.iloc[start:start + len(indices)].copy()
+    block['distance_to_station_km'] = distances_km[:, 0]
+    if distance_method is not None:
+        block['distance_to_station_km'] = pairwise_distance(
+            distance_method, block['prop_lat'], block['prop_lon'],
+            station_index.lat[indices], station_index.lon[indices]) / 1000
+
+    # === Add station info to postcodes ===
+    block['nearest_station_name'] = station_index.names[indices]
+    block['station_lat'] = station_index.lat[indices]
+    block['station_lon'] = station_index.lon[indices]
+    block['station_creation_year'] = station_index.creation_year[indices]
+    writer.write(block)
+
+writer.close(empty_frame=df_post.assign(
+    distance_to_station_km=np.nan, nearest_station_name=None,
+    station_lat=np.nan, station_lon=np.nan, station_creation_year=np.nan))
+print(f"Output saved to: {output_file} ({len(df_post):,} postcodes in blocks of {block_size:,})")
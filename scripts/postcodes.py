@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from intermediate_store import load_stage, save_stage
+
+
+def normalise_postcodes(values):
+    """Strip, remove spaces and uppercase, once per distinct raw postcode."""
+    codes, uniques = pd.factorize(pd.Series(values).astype(str))
+    clean = pd.Index(uniques).str.strip().str.replace(" ", "").str.upper()
+    return np.asarray(clean, dtype=object)[codes]
+
+
+class PostcodeDictionary:
+    """Sorted postcode vocabulary shared by every stage.
+
+    Each normalised postcode gets a compact int32 id (its position in the
+    sorted vocabulary); stages join on these ids instead of strings.
+    Postcodes outside the vocabulary encode to -1.
+    """
+
+    def __init__(self, postcodes):
+        self.postcodes = np.asarray(postcodes, dtype=object)
+        self._index = pd.Index(self.postcodes)
+
+    @classmethod
+    def build(cls, values):
+        return cls(np.unique(normalise_postcodes(values)))
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_stage(path)['postcode'].to_numpy(dtype=object))
+
+    def save(self, path):
+        save_stage(pd.DataFrame({'postcode': self.postcodes}), path)
+
+    def __len__(self):
+        return len(self.postcodes)
+
+    def encode(self, values, normalised=False):
+        clean = values if normalised else normalise_postcodes(values)
+        codes, uniques = pd.factorize(pd.Series(clean))
+        ids = self._index.get_indexer(uniques).astype(np.int32)
+        return np.where(codes >= 0, ids[codes], -1).astype(np.int32)
+
+    def decode(self, ids):
+        ids = np.asarray(ids)
+        out = np.full(len(ids), None, dtype=object)
+        out[ids >= 0] = self.postcodes[ids[ids >= 0]]
+        return out
+
+    def positions(self, ids, table_ids):
+        """Row position in a table keyed by ``table_ids`` for each id (-1 if absent)."""
+        lookup = np.full(len(self.postcodes), -1, dtype=np.int64)
+        table_ids = np.asarray(table_ids)
+        valid = table_ids >= 0
+        lookup[table_ids[valid]] = np.flatnonzero(valid)
+        ids = np.asarray(ids)
+        return np.where(ids >= 0, lookup[np.maximum(ids, 0)], -1)
+
+
+def gather(table, columns, pos):
+    """Take ``columns`` from ``table`` at row positions ``pos``; -1 gives missing."""
+    matched = pos >= 0
+    safe = np.where(matched, pos, 0)
+    out = {}
+    for col in columns:
+        values = pd.Series(table[col].to_numpy()[safe]) if len(table) else pd.Series([np.nan] * len(pos))
+        out[col] = values.where(matched).to_numpy()
+    return pd.DataFrame(out)
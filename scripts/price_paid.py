@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import pandas as pd
+from intermediate_store import count_read
+
+# === Column Definitions & Schema (Land Registry Price Paid, no header) ===
+columns = [
+    'transaction_unique_identifier','price','date_of_transfer','postcode',
+    'property_type','old_new','duration','paon','saon','street','locality',
+    'town/city','district','county','ppd_category_type','record_status'
+]
+dtypes = {col: 'str' for col in columns}
+dtypes['price'] = 'int64'
+
+output_columns = columns + ['year_of_transaction', 'railway_period']
+
+# === Station-opening table: one row per study town ===
+# core towns switch Pre -> Post on opening_date; control towns keep one label.
+# Adding a row here adds the town to the study.
+openings_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "station_openings.csv")
+openings = pd.read_csv(openings_path, parse_dates=['opening_date'])
+openings['town'] = openings['town'].str.strip().str.upper()
+openings = openings.set_index('town')
+
+target_cities = openings.index.tolist()
+
+
+def read_price_paid(path, chunk_size=None):
+    """Yield the raw file in chunks (a single chunk if ``chunk_size`` is None)."""
+    count_read(0, path)
+    if chunk_size is None:
+        chunks = [pd.read_csv(path, header=None, names=columns, usecols=range(16), dtype=dtypes)]
+    else:
+        chunks = pd.read_csv(path, header=None, names=columns, usecols=range(16),
+                             dtype=dtypes, chunksize=chunk_size)
+    for chunk in chunks:
+        count_read(len(chunk))
+        yield chunk
+
+
+# === Assign Period Labels (vectorized lookup + np.select) ===
+def assign_period(towns, dates):
+    group = towns.map(openings['group'])
+    opening_date = towns.map(openings['opening_date'])
+    conditions = [
+        dates.isna(),
+        (group == 'core') & (dates < opening_date),
+        group == 'core',
+        group == 'always_station',
+        group == 'no_station',
+    ]
+    choices = ['Unknown', 'Pre', 'Post', 'Control-Station', 'Control-NoStation']
+    return np.select(conditions, choices, default='Unknown')
+
+
+def clean_chunk(df):
+    # === Filter Selected Towns only (ไม่กรองปี) — pushed down before any parsing ===
+    df['town/city'] = df['town/city'].astype(str).str.upper()
+    df_filtered = df[df['town/city'].isin(target_cities)].copy()
+
+    # === Clean & Standardize ===
+    df_filtered['date_of_transfer'] = pd.to_datetime(df_filtered['date_of_transfer'], errors='coerce')
+
+    # === Extract Year of Transaction ===
+    df_filtered['year_of_transaction'] = df_filtered['date_of_transfer'].dt.year.astype('Int64')
+
+    df_filtered['railway_period'] = assign_period(df_filtered['town/city'], df_filtered['date_of_transfer'])
+    return df_filtered
+
+
+def apply_record_status(existing, changes, upserts=None):
+    """Apply a monthly change file to a processed table.
+
+    Every ``transaction_unique_identifier`` in ``changes`` is removed from
+    ``existing``; D (deleted) records stay removed and A/C (added/changed)
+    records are appended. ``upserts`` replaces the A/C rows of ``changes``
+    when they have already been enriched by downstream stages.
+    """
+    key = 'transaction_unique_identifier'
+    kept = existing[~existing[key].isin(changes[key])]
+    if upserts is None:
+        upserts = changes[changes['record_status'].isin(['A', 'C'])]
+    return pd.concat([kept, upserts.reindex(columns=existing.columns)], ignore_index=True)
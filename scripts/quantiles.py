@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+
+class KLLSketch:
+    """Mergeable KLL quantile sketch over float values (NumPy-batched).
+
+    Level ``h`` holds items of weight ``2**h``; a level that outgrows its
+    capacity is sorted and every other item (random offset) is promoted.
+    Rank error is roughly ``1.7 / k`` with high probability.
+    """
+
+    def __init__(self, k=2000, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return max(8, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            if len(self.levels[h]) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                level = np.sort(self.levels[h])
+                if len(level) % 2:
+                    # Keep one item back so an even number is compacted
+                    self.levels[h], level = level[-1:], level[:-1]
+                else:
+                    self.levels[h] = np.empty(0)
+                promoted = level[self.rng.integers(2)::2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self._compress()
+        return self
+
+    def quantile(self, qs):
+        values = np.concatenate(self.levels)
+        if values.size == 0:
+            return np.full(len(np.atleast_1d(qs)), np.nan)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values)
+        values, cum = values[order], np.cumsum(weights[order])
+        ranks = np.asarray(qs, dtype=float) * cum[-1]
+        return values[np.minimum(np.searchsorted(cum, ranks, side='left'), len(values) - 1)]
+
+
+# === Bounds: {group: {column: (low, high)}}, group is None when not grouped ===
+
+def _groups(df, group_by):
+    if group_by is None:
+        return [(None, df)]
+    return list(df.groupby(group_by, observed=True, sort=False))
+
+
+def iqr_bounds_exact(df, columns, group_by=None, whisker=1.5):
+    """Q1/Q3 of every column (and group) in one ``quantile`` call per group."""
+    bounds = {}
+    for key, part in _groups(df, group_by):
+        q = part[columns].quantile([0.25, 0.75])
+        bounds[key] = {}
+        for col in columns:
+            q1, q3 = q.at[0.25, col], q.at[0.75, col]
+            bounds[key][col] = (q1 - whisker * (q3 - q1), q3 + whisker * (q3 - q1))
+    return bounds
+
+
+def winsor_bounds_exact(df, columns, limits=(0.01, 0.01), group_by=None):
+    """Clip values matching ``scipy.stats.mstats.winsorize`` order statistics."""
+    bounds = {}
+    for key, part in _groups(df, group_by):
+        bounds[key] = {}
+        n = len(part)
+        lo_idx = int(limits[0] * n)
+        hi_idx = n - int(limits[1] * n) - 1
+        for col in columns:
+            values = part[col].to_numpy(dtype=float)
+            if n == 0:
+                bounds[key][col] = (np.nan, np.nan)
+                continue
+            picked = np.partition(values, [lo_idx, hi_idx])
+            bounds[key][col] = (picked[lo_idx], picked[hi_idx])
+    return bounds
+
+
+class SketchSet:
+    """One KLL sketch per (group, column), filled chunk by chunk and mergeable."""
+
+    def __init__(self, columns, group_by=None, k=2000):
+        self.columns = columns
+        self.group_by = group_by
+        self.k = k
+        self.sketches = {}
+
+    def update(self, df):
+        for key, part in _groups(df, self.group_by):
+            for col in self.columns:
+                sketch = self.sketches.setdefault((key, col), KLLSketch(self.k))
+                sketch.update(part[col].to_numpy(dtype=float))
+        return self
+
+    def merge(self, other):
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                self.sketches[key] = sketch
+        return self
+
+    def bounds(self, low_q, high_q, whisker=None):
+        """Quantile bounds per group; with ``whisker`` they become IQR fences."""
+        bounds = {}
+        for (key, col), sketch in self.sketches.items():
+            lo, hi = sketch.quantile([low_q, high_q])
+            if whisker is not None:
+                lo, hi = lo - whisker * (hi - lo), hi + whisker * (hi - lo)
+            bounds.setdefault(key, {})[col] = (lo, hi)
+        return bounds
+
+
+def _row_bounds(df, bounds, col, group_by):
+    if group_by is None:
+        lo, hi = bounds[None][col]
+        return lo, hi
+    keys = df[group_by]
+    lo = keys.map({key: b[col][0] for key, b in bounds.items()}).to_numpy(dtype=float)
+    hi = keys.map({key: b[col][1] for key, b in bounds.items()}).to_numpy(dtype=float)
+    return lo, hi
+
+
+def within_bounds(df, bounds, columns, group_by=None):
+    """Boolean mask: every column inside its (group's) bounds, inclusive."""
+    mask = np.ones(len(df), dtype=bool)
+    for col in columns:
+        lo, hi = _row_bounds(df, bounds, col, group_by)
+        values = df[col].to_numpy(dtype=float)
+        mask &= (values >= lo) & (values <= hi)
+    return mask
+
+
+def clip_to_bounds(df, bounds, col, group_by=None):
+    """Clip a column to its (group's) bounds, keeping integer dtypes integer."""
+    lo, hi = _row_bounds(df, bounds, col, group_by)
+    clipped = np.clip(df[col].to_numpy(dtype=float), lo, hi)
+    if pd.api.types.is_integer_dtype(df[col].dtype) and not np.isnan(clipped).any():
+        return clipped.astype(df[col].dtype)
+    return clipped
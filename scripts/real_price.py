@@ -1,45 +1,38 @@
 import pandas as pd
+from cpi_deflator import CPIDeflator
+from intermediate_store import load_stage, save_stage, count_read
 
 # === Input and output file paths ===
 property_file = "INPUT YOUR FILE PATH HERE"
 inflation_file = "INPUT YOUR FILE PATH HERE"
 output_file = "INPUT YOUR FILE PATH HERE"
 
+# === Deflation settings ===
+granularity = "annual"   # "annual" (average CPI per year) or "monthly"
+# Output column -> base period: "2024" (annual average), "2024-06" (month) or a CPI value
+base_periods = {
+    'real_price': '2024',        # 2024 prices
+    # 'real_price_2015': 100,    # 2015=100 prices
+}
+
 # === Load datasets ===
-df = pd.read_csv(property_file, low_memory=False)
+df = load_stage(property_file)
 inflation = pd.read_csv(inflation_file)
+count_read(len(inflation), inflation_file)
 
-# Clean column names
-inflation.columns = inflation.columns.str.strip().str.lower()
-
-# Extract year and convert to integer
-inflation['year_of_transaction'] = inflation['year'].astype(str).str.extract(r'(\d{4})')
-inflation['year_of_transaction'] = pd.to_numeric(inflation['year_of_transaction'], errors='coerce')
-
-# Keep only valid rows with CPI
-inflation = inflation.dropna(subset=['year_of_transaction', 'cpi index 00: all items 2015=100'])
-
-# Calculate annual CPI average
-inflation_annual = (
-    inflation
-    .groupby('year_of_transaction')['cpi index 00: all items 2015=100']
-    .mean()
-    .reset_index()
-    .rename(columns={'cpi index 00: all items 2015=100': 'cpi_annual'})
-)
+# === Build CPI arrays once (indexed by year / month offset) ===
+deflator = CPIDeflator(inflation)
 
 # Extract year from transaction date
-df['year_of_transaction'] = pd.to_datetime(df['date_of_transfer'], errors='coerce').dt.year
-
-# Merge with annual CPI
-df = df.merge(inflation_annual, on='year_of_transaction', how='left')
-
-# Set base CPI (2024)
-cpi_base = inflation_annual[inflation_annual['year_of_transaction'] == 2024]['cpi_annual'].mean()
+df['date_of_transfer'] = pd.to_datetime(df['date_of_transfer'], errors='coerce')
+df['year_of_transaction'] = df['date_of_transfer'].dt.year
 
-# Adjust real price
-df['real_price'] = df['price'] * (cpi_base / df['cpi_annual'])
+# === One CPI gather, every base period applied to it ===
+cpi, real_prices = deflator.deflate(df['price'], df['date_of_transfer'], base_periods, granularity)
+df[f'cpi_{granularity}'] = cpi
+for col, values in real_prices.items():
+    df[col] = values
 
 # Save final dataset
-df.to_csv(output_file, index=False)
-print("Final dataset saved with real_price adjusted using annual CPI.")
+save_stage(df, output_file)
+print(f"Final dataset saved with {', '.join(real_prices)} adjusted using {granularity} CPI.")
@@ -1,25 +1,27 @@
-import pandas as pd
+from postcodes import PostcodeDictionary, gather
+from station_index import report_dedup
+from intermediate_store import load_stage, save_stage
 
 # === File paths ===
 property_file = "INPUT YOUR FILE PATH HERE"
 nearest_station_file = "INPUT YOUR FILE PATH HERE"
+postcode_dictionary_file = "INPUT YOUR FILE PATH HERE"
 output_file = "INPUT YOUR FILE PATH HERE"
 
 # === Load datasets ===
-df_property = pd.read_csv(property_file, low_memory=False)
-df_station = pd.read_csv(nearest_station_file)
-
-# === Standardize postcode format: remove spaces + uppercase
-df_property['postcode_clean'] = df_property['postcode'].astype(str).str.replace(" ", "").str.upper()
-df_station['postcode_clean'] = df_station['postcode'].astype(str).str.replace(" ", "").str.upper()
-
-# === Merge on cleaned postcode
-df_merged = df_property.merge(
-    df_station[['postcode_clean', 'nearest_station_name', 'station_lat', 'station_lon',
-                'station_creation_year', 'distance_to_station_km']],
-    on='postcode_clean',
-    how='left'
-)
+df_property = load_stage(property_file)
+df_station = load_stage(nearest_station_file, columns=[
+    'postcode_id', 'nearest_station_name', 'station_lat', 'station_lon',
+    'station_creation_year', 'distance_to_station_km'])
+
+# === Join on int32 postcode_id (from the shared postcode dictionary)
+station_cols = ['nearest_station_name', 'station_lat', 'station_lon',
+                'station_creation_year', 'distance_to_station_km']
+postcode_dict = PostcodeDictionary.load(postcode_dictionary_file)
+report_dedup("Postcode keys", len(df_property), df_property['postcode_id'].nunique())
+pos = postcode_dict.positions(df_property['postcode_id'], df_station['postcode_id'])
+df_merged = df_property.reset_index(drop=True)
+df_merged[station_cols] = gather(df_station, station_cols, pos)
 
 # === Manage missing station info
 df_merged['nearest_station_name'] = df_merged['nearest_station_name'].fillna('NO_STATION')
@@ -30,7 +32,7 @@ df_merged['station_creation_year'] = df_merged['station_creation_year'].fillna(-
 df_merged['distance_to_station'] = df_merged['distance_to_station_km'] * 1000
 
 # === Drop columns that not use 
-df_merged.drop(columns=['postcode_clean', 'distance_to_station_km'], inplace=True)
+df_merged.drop(columns=['distance_to_station_km'], inplace=True)
 
 # Check record that don't have nearest station
 print("\n record that don't have nearest station:")
@@ -41,5 +43,5 @@ else:
     print("Do not found column 'town' or 'town/city' in dataset")
 
 # === Save final output
-df_merged.to_csv(output_file, index=False)
+save_stage(df_merged, output_file)
 print(f"\n Merged dataset saved to:\n{output_file}")
@@ -0,0 +1,67 @@
+import pandas as pd
+from intermediate_store import load_stage, StageWriter
+from station_index import StationIndex, BNGStationIndex, load_or_build_index, query_in_blocks
+
+# === File Paths ===
+postcode_file = "INPUT YOUR FILE PATH HERE"          # Code-Point table saved by merge_codepoint_latlon.py
+station_file = "INPUT YOUR FILE PATH HERE"           # output of clean_naptan_data.py (rail stations)
+bus_stop_file = "INPUT YOUR FILE PATH HERE"          # output of clean_naptan_data.py (bus stops)
+station_index_file = "INPUT YOUR FILE PATH HERE"
+bus_stop_index_file = "INPUT YOUR FILE PATH HERE"
+output_file = "INPUT YOUR FILE PATH HERE"            # one row per postcode_id
+
+# === Feature settings ===
+station_k = 3                     # distances to the 1st..kth nearest station
+station_radii_km = [1, 2, 5]      # station counts within each radius
+bus_stop_radii_km = [0.5, 1]      # bus-stop counts within each radius
+
+# === Chunked query settings ===
+block_size = 100_000
+n_jobs = -1
+distance_mode = "haversine"       # or "bng" (KD-tree on Easting/Northing)
+index_class = {'haversine': StationIndex, 'bng': BNGStationIndex}[distance_mode]
+
+# === Load postcodes ===
+query_cols = ['Latitude', 'Longitude'] if distance_mode == 'haversine' else ['Easting', 'Northing']
+df_post = load_stage(postcode_file, columns=['postcode_id', *query_cols])
+df_post = df_post.dropna(subset=query_cols).reset_index(drop=True)
+
+# === Load (or build once) station and bus-stop trees ===
+# The station table holds both RLY (station access area) and RSE (entrance) stops,
+# each with its own ATCOCode. Counting/ranking entrances would count one station
+# several times, so the station tree keeps one RLY point per station.
+station_stop_types = ['RLY']
+
+
+def build_index(path, stop_types=None):
+    df = load_stage(path).dropna(subset=['Latitude', 'Longitude'])
+    if stop_types is not None:
+        df = df[df['StopType'].isin(stop_types)]
+    return index_class.from_frame(df)
+
+load_or_build_index(station_index_file, station_file, lambda: build_index(station_file, station_stop_types),
+                    kind=index_class, params={'stop_types': station_stop_types})
+load_or_build_index(bus_stop_index_file, bus_stop_file, lambda: build_index(bus_stop_file), kind=index_class)
+
+# === One k-NN + one radius query per tree per postcode block, streamed to disk ===
+x, y = df_post[query_cols[0]], df_post[query_cols[1]]
+station_blocks = query_in_blocks(station_index_file, x, y, block_size=block_size, n_jobs=n_jobs,
+                                 method='neighbour_features', k=station_k,
+                                 radii_km=station_radii_km, prefix='stations')
+bus_blocks = query_in_blocks(bus_stop_index_file, x, y, block_size=block_size, n_jobs=n_jobs,
+                             method='neighbour_features', k=0,
+                             radii_km=bus_stop_radii_km, prefix='bus_stops')
+
+writer = StageWriter(output_file)
+for (start, station_features), (_, bus_features) in zip(station_blocks, bus_blocks):
+    block = pd.DataFrame({'postcode_id': df_post['postcode_id'].to_numpy()[start:start + block_size]})
+    for name, values in {**station_features, **bus_features}.items():
+        block[name] = values
+    # Metres, to match distance_to_station
+    for j in range(2, station_k + 1):
+        block[f'distance_to_station_{j}'] = block.pop(f'stations_dist_{j}_km') * 1000
+    block = block.drop(columns=['stations_dist_1_km'])
+    writer.write(block)
+writer.close(empty_frame=pd.DataFrame(columns=['postcode_id']))
+
+print(f"Spatial features for {len(df_post):,} postcodes saved to: {output_file}")
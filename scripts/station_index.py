@@ -0,0 +1,383 @@
+import hashlib
+import inspect
+import os
+import joblib
+from joblib import Parallel, delayed
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree, KDTree
+from distance_kernels import pairwise_distance, to_bng
+
+EARTH_RADIUS_KM = 6371
+
+# Day value for a missing date: never opened / never closed
+_NO_DAY = np.iinfo(np.int64).max
+
+
+def dedup_keys(*columns):
+    """Integer key code per row and the first row of each distinct key."""
+    keys = pd.DataFrame({i: np.asarray(col) for i, col in enumerate(columns)})
+    codes = keys.groupby(list(keys.columns), sort=False, dropna=False).ngroup().to_numpy()
+    _, first_rows = np.unique(codes, return_index=True)
+    return codes, first_rows
+
+
+def report_dedup(label, n_rows, n_keys):
+    ratio = n_rows / n_keys if n_keys else 0.0
+    print(f"{label}: {n_rows:,} rows -> {n_keys:,} unique keys (dedup ratio {ratio:.1f}x)")
+
+
+def _radians_array(lat, lon):
+    # Contiguous (n, 2) float64 array of [lat, lon] in radians, built without Python tuples
+    coords = np.empty((len(lat), 2), dtype=np.float64)
+    coords[:, 0] = lat
+    coords[:, 1] = lon
+    return np.radians(coords, out=coords)
+
+
+def index_format(index_class, params=None):
+    """Fingerprint of the code that builds ``index_class`` plus its build ``params``.
+
+    Any change to the class (or a base class in this module) or to the
+    parameters gives a new fingerprint, so a saved index from older code is
+    rebuilt instead of being queried with attributes it does not have.
+    """
+    digest = hashlib.sha1()
+    for cls in index_class.__mro__:
+        if cls.__module__ == __name__:
+            digest.update(inspect.getsource(cls).encode())
+    digest.update(repr(sorted((params or {}).items())).encode())
+    return digest.hexdigest()[:16]
+
+
+def save_index(index, path, params=None):
+    """Persist a station index; arrays are stored uncompressed so they can be memory-mapped."""
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    joblib.dump({'format': index_format(type(index), params), 'index': index}, path)
+
+
+def _load_payload(path, mmap=True):
+    payload = joblib.load(path, mmap_mode='r' if mmap else None)
+    # Files saved before the format fingerprint hold the bare index
+    return payload if isinstance(payload, dict) and 'format' in payload else {'format': None, 'index': payload}
+
+
+def load_index(path, mmap=True):
+    return _load_payload(path, mmap)['index']
+
+
+def load_or_build_index(index_path, source_path, build, kind=None, params=None):
+    """Load ``index_path`` if it is newer than ``source_path``, else ``build()`` and save it.
+
+    ``kind`` forces a rebuild when the saved index is of a different class
+    (e.g. a haversine index saved where a BNG one is wanted), and ``params``
+    (the build settings) when they, or the index code, differ from the saved
+    index's (see ``index_format``).
+    """
+    if index_path and os.path.exists(index_path) and (
+            not os.path.exists(source_path) or os.path.getmtime(index_path) >= os.path.getmtime(source_path)):
+        payload = _load_payload(index_path)
+        index = payload['index']
+        if (kind is None or type(index) is kind) and payload['format'] == index_format(type(index), params):
+            print(f"Loaded station index: {index_path}")
+            return index
+        print(f"Station index {index_path} was built by other code or settings; rebuilding")
+    index = build()
+    if index_path:
+        save_index(index, index_path, params)
+        print(f"Saved station index: {index_path}")
+    return index
+
+
+class StationIndex:
+    """Haversine BallTree over all stations, built from contiguous float arrays.
+
+    Save with ``save_index`` and reload with ``load_index``; the tree arrays
+    are memory-mapped on load, so repeated runs skip the build entirely.
+    """
+
+    def __init__(self, lat, lon, names, creation_year=None):
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.names = np.asarray(names, dtype=object)
+        self.creation_year = None if creation_year is None else np.asarray(creation_year, dtype=np.float64)
+        self.tree = self._build_tree()
+
+    def _build_tree(self):
+        return BallTree(_radians_array(self.lat, self.lon), metric='haversine')
+
+    @classmethod
+    def from_frame(cls, stations, lat_col='Latitude', lon_col='Longitude',
+                   name_col='CommonName', year_col='creation_year'):
+        return cls(stations[lat_col].to_numpy(dtype=np.float64),
+                   stations[lon_col].to_numpy(dtype=np.float64),
+                   stations[name_col].to_numpy(dtype=object),
+                   stations[year_col].to_numpy(dtype=np.float64) if year_col in stations.columns else None)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _points(self, lat, lon):
+        return _radians_array(np.asarray(lat), np.asarray(lon))
+
+    def _to_km(self, distances):
+        return distances * EARTH_RADIUS_KM
+
+    def _from_km(self, km):
+        return km / EARTH_RADIUS_KM
+
+    def query(self, x, y, k=1):
+        """Distances (km) and station positions of the ``k`` nearest stations."""
+        distances, indices = self.tree.query(self._points(x, y), k=k)
+        return self._to_km(distances), indices
+
+    def neighbour_features(self, x, y, k=3, radii_km=(1, 2, 5), prefix='stations'):
+        """Distances to the ``k`` nearest points and counts within each radius.
+
+        One k-NN query and one radius query at the largest radius per call;
+        the counts for every smaller radius come from the same result.
+        """
+        points = self._points(x, y)
+        features = {}
+        if k:
+            # Ranks beyond the number of indexed points come back as NaN
+            distances = np.full((len(points), k), np.nan)
+            available = min(k, len(self))
+            if available:
+                distances[:, :available] = self._to_km(self.tree.query(points, k=available)[0])
+            for j in range(k):
+                features[f'{prefix}_dist_{j + 1}_km'] = distances[:, j]
+
+        if radii_km:
+            neighbour_dist = self.tree.query_radius(points, r=self._from_km(max(radii_km)), return_distance=True)[1]
+            lengths = np.fromiter((len(d) for d in neighbour_dist), dtype=np.int64, count=len(points))
+            all_dist = self._to_km(np.concatenate(neighbour_dist)) if lengths.sum() else np.empty(0)
+            owner = np.repeat(np.arange(len(points)), lengths)
+            for radius in radii_km:
+                features[f'{prefix}_within_{round(radius * 1000)}m'] = np.bincount(
+                    owner[all_dist <= radius], minlength=len(points)).astype(np.int32)
+        return features
+
+
+class BNGStationIndex(StationIndex):
+    """Euclidean KD-tree over stations projected once to British National Grid.
+
+    Queries take Code-Point ``Easting``/``Northing`` (EPSG:27700) directly, so
+    postcodes never go through lat/lon; over a few km in England and Wales
+    planar BNG distances agree with haversine to within metres.
+    """
+
+    def _build_tree(self):
+        # Project once; queries then stay in metres on the grid
+        self.easting, self.northing = to_bng(self.lat, self.lon)
+        return KDTree(np.column_stack([self.easting, self.northing]))
+
+    def _points(self, easting, northing):
+        return np.column_stack([np.asarray(easting, dtype=np.float64), np.asarray(northing, dtype=np.float64)])
+
+    def _to_km(self, distances):
+        return distances / 1000
+
+    def _from_km(self, km):
+        return km * 1000
+
+
+def _query_block(index_path, x, y, method, kwargs):
+    # Runs in a worker process: the saved index is memory-mapped, not copied
+    return getattr(load_index(index_path), method)(x, y, **kwargs)
+
+
+def query_in_blocks(index_path, x, y, block_size=100_000, n_jobs=-1, method='query', **kwargs):
+    """Yield ``(start, result)`` per block of queries, in order.
+
+    ``result`` is ``index.<method>(x_block, y_block, **kwargs)``, e.g. the
+    ``(distances_km, indices)`` pair of ``query``. ``x``/``y`` are lat/lon for
+    ``StationIndex`` and easting/northing for ``BNGStationIndex``. Blocks are
+    spread over a pool of worker processes that each load the persisted
+    index from ``index_path``; only a bounded number of blocks is in flight
+    at once, so memory is set by ``block_size`` rather than the number of
+    queries.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    starts = range(0, len(x), block_size)
+    results = Parallel(n_jobs=n_jobs, return_as='generator', pre_dispatch='2*n_jobs')(
+        delayed(_query_block)(index_path, x[i:i + block_size], y[i:i + block_size], method, kwargs)
+        for i in starts
+    )
+    yield from zip(starts, results)
+
+
+class _SnapshotStationIndex:
+    """Shared machinery for indexes that keep one BallTree per station snapshot.
+
+    Subclasses set ``lat``/``lon``/``names``/``ids``, ``trees`` and
+    ``members`` (station positions in each tree, or None for a prefix of the
+    station table) and implement ``snapshot_of`` to route each query.
+    """
+
+    refine_k = 3
+    distance_method = 'vincenty'
+
+    def _set_stations(self, stations):
+        self.lat = stations['Latitude'].to_numpy(dtype=float)
+        self.lon = stations['Longitude'].to_numpy(dtype=float)
+        self.names = stations['CommonName'].to_numpy(dtype=object)
+        if 'ATCOCode' in stations.columns:
+            self.ids = stations['ATCOCode'].astype(str).to_numpy(dtype=object)
+        else:
+            self.ids = stations.index.astype(str).to_numpy(dtype=object)
+
+    def query(self, lat, lon, when):
+        """Return distance (m), name and id of the nearest open station per query."""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        snap = self.snapshot_of(when)
+
+        distance = np.full(len(lat), np.nan)
+        station_pos = np.full(len(lat), -1, dtype=np.int64)
+
+        for s, tree in enumerate(self.trees):
+            rows = np.flatnonzero(snap == s)
+            if rows.size == 0 or tree is None:
+                continue
+            size = self.snapshot_sizes[s]
+            k = min(self.refine_k, size)
+            query_radians = _radians_array(lat[rows], lon[rows])
+            _, candidates = tree.query(query_radians, k=k)
+            if self.members[s] is not None:
+                candidates = self.members[s][candidates]
+
+            # Haversine shortlists the candidates; the selected distance method
+            # (ellipsoidal by default, as geopy geodesic) picks the winner.
+            cand_dist = pairwise_distance(
+                self.distance_method,
+                np.repeat(lat[rows], k), np.repeat(lon[rows], k),
+                self.lat[candidates.ravel()], self.lon[candidates.ravel()],
+            ).reshape(len(rows), k)
+            best = cand_dist.argmin(axis=1)
+            distance[rows] = cand_dist[np.arange(len(rows)), best]
+            station_pos[rows] = candidates[np.arange(len(rows)), best]
+
+        found = station_pos >= 0
+        names = np.full(len(lat), None, dtype=object)
+        ids = np.full(len(lat), None, dtype=object)
+        names[found] = self.names[station_pos[found]]
+        ids[found] = self.ids[station_pos[found]]
+
+        return pd.DataFrame({
+            'distance_to_station': distance,
+            'nearest_station_name': names,
+            'nearest_station_id': ids,
+        })
+
+    def query_by_postcode(self, postcodes, lat, lon, when):
+        """Like ``query`` but computed once per (postcode, snapshot) key.
+
+        Every postcode has a single coordinate, so transactions sharing a
+        postcode and a snapshot share a nearest station. Results are
+        computed for the distinct keys and scattered back by key code.
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        when = np.asarray(when)
+        codes, first_rows = dedup_keys(postcodes, self.snapshot_of(when))
+        report_dedup("Distance keys (postcode, snapshot)", len(codes), len(first_rows))
+
+        unique_result = self.query(lat[first_rows], lon[first_rows], when[first_rows])
+        return unique_result.take(codes).reset_index(drop=True)
+
+
+class TimeAwareStationIndex(_SnapshotStationIndex):
+    """Nearest-station lookups that only see stations open in the query year.
+
+    Stations are sorted by ``creation_year`` so that every opening-year
+    snapshot is a prefix of the station table; one BallTree is built per
+    distinct opening year and each query is routed to the latest snapshot
+    not after its ``year_of_transaction``.
+    """
+
+    def __init__(self, stations, refine_k=3, distance_method='vincenty'):
+        stations = stations.sort_values('creation_year', kind='stable').reset_index(drop=True)
+        self._set_stations(stations)
+        self.refine_k = refine_k
+        self.distance_method = distance_method
+
+        creation_years = stations['creation_year'].to_numpy(dtype=float)
+        self.snapshot_years = np.unique(creation_years)
+        # Number of stations open in each snapshot (prefix length)
+        self.snapshot_sizes = np.searchsorted(creation_years, self.snapshot_years, side='right')
+
+        coords = _radians_array(self.lat, self.lon)
+        self.trees = [BallTree(coords[:size], metric='haversine') for size in self.snapshot_sizes]
+        self.members = [None] * len(self.trees)
+
+    def snapshot_of(self, years):
+        """Snapshot position for each year, or -1 if no station existed yet."""
+        years = np.asarray(years, dtype=float)
+        pos = np.searchsorted(self.snapshot_years, years, side='right') - 1
+        pos[np.isnan(years)] = -1
+        return pos
+
+
+class StationIntervalIndex(_SnapshotStationIndex):
+    """Stations open over ``[opened, closed)`` date intervals, at day resolution.
+
+    Opening and closing dates become a sorted array of daily events; each span
+    between two events is one snapshot with its own BallTree over the stations
+    open then. Batches of dates are routed with one ``searchsorted`` on the
+    event array, so a station counts from its exact opening date (Kenilworth,
+    2018-04-30), the same cut-off ``price_paid.assign_period`` uses for
+    Pre/Post.
+    """
+
+    def __init__(self, stations, opened_col='creation_date', closed_col='closed_date',
+                 refine_k=3, distance_method='vincenty'):
+        stations = stations.reset_index(drop=True)
+        self._set_stations(stations)
+        self.refine_k = refine_k
+        self.distance_method = distance_method
+
+        self.opened = _to_day(stations[opened_col])
+        if closed_col in stations.columns:
+            self.closed = _to_day(stations[closed_col])
+        else:
+            self.closed = np.full(len(stations), _NO_DAY)
+
+        events = np.concatenate([self.opened, self.closed])
+        self.snapshot_days = np.unique(events[events != _NO_DAY])
+        coords = _radians_array(self.lat, self.lon)
+        self.members = []
+        self.trees = []
+        for day in self.snapshot_days:
+            members = np.flatnonzero((self.opened <= day) & (self.closed > day))
+            self.members.append(members)
+            self.trees.append(BallTree(coords[members], metric='haversine') if members.size else None)
+        self.snapshot_sizes = np.array([len(m) for m in self.members], dtype=np.int64)
+
+    def snapshot_of(self, dates):
+        """Snapshot position for each date, or -1 before the first opening."""
+        days = _to_day(dates)
+        pos = np.searchsorted(self.snapshot_days, days, side='right') - 1
+        pos[days == _NO_DAY] = -1
+        return pos
+
+    def open_at(self, dates):
+        """ATCO codes (ids) of the stations open at each date."""
+        empty = np.empty(0, dtype=object)
+        return [self.ids[self.members[s]] if s >= 0 else empty for s in self.snapshot_of(dates)]
+
+    def nearest_open(self, lat, lon, dates):
+        """Nearest station open at each date: distance (m), name and id."""
+        return self.query(lat, lon, dates)
+
+
+def _to_day(dates):
+    # Days since 1970-01-01 as int64; missing dates map to _NO_DAY
+    dates = pd.to_datetime(pd.Series(np.asarray(dates)), errors='coerce')
+    days = np.full(len(dates), _NO_DAY, dtype=np.int64)
+    valid = dates.notna().to_numpy()
+    days[valid] = dates[valid].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return days